@@ -0,0 +1,180 @@
+# --- Custom modules for the project --- #
+from agents.merging import most_common # Company and unit most chunks agree on
+from structured_output import output_classes as output # Declares the output classes that the agents will return
+from structured_output.dataframe_builder import SECTIONS, split_entry # Parses the "[NOME DO CAMPO]: [VALOR_1], [VALOR_2]" entries
+from pdf_parsing import chunking # Splits the document into token-budgeted chunks
+from pdf_parsing.page_filter import normalize
+from tracing.stage_tracing import stage # Times each chunk request
+
+# --- Python modules --- #
+import re
+import asyncio
+
+# --- Config --- #
+# Chunk requests in flight at once. Rate limits are shared with every other request of the key.
+MAX_CONCURRENT_CHUNKS = 4
+# Value of a merged entry for a period its chunk did not report. It is not parsed as an amount,
+# so build_dataframe leaves it empty and lists the entry under "nao_convertidos".
+MISSING_VALUE = "n/d"
+
+# --- Periods --- #
+_FULL_DATE = re.compile(r"(\d{1,2})[/.\-](\d{1,2})[/.\-](\d{2,4})")
+_YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+
+def period_key(date):
+    """Comparable form of a date in `datas`: 'yyyy-mm-dd', or 'yyyy' when only the year is given."""
+    date = str(date)
+    full = _FULL_DATE.search(date)
+    if full:
+        day, month, year = (int(part) for part in full.groups())
+        return f"{year + 2000 if year < 100 else year:04d}-{month:02d}-{day:02d}"
+    year = _YEAR.search(date)
+    return year.group(0) if year else " ".join(normalize(date).split())
+
+def _match_period(key, keys, used):
+    """Index of the merged period `key` matches, skipping the periods already used by the same chunk."""
+    for i, other in enumerate(keys):
+        if i not in used and other == key:
+            return i
+    # A year alone matches the single full date of that year ("2023" and "31/12/2023")
+    if key[:4].isdigit():
+        same_year = [i for i, other in enumerate(keys)
+                     if i not in used and other[:4] == key[:4] and (len(key) == 4) != (len(other) == 4)]
+        if len(same_year) == 1:
+            return same_year[0]
+    return None
+
+def reconcile_periods(chunk_datas):
+    """
+    Merge the `datas` of every chunk into one list of periods
+
+    Periods are matched on their date, whatever their format ("31/12/2023", "31.12.2023",
+    "2023"), and kept in order of first appearance. A full date replaces a year alone.
+    Returns:
+        Tuple (merged datas, list with the merged index of each period of each chunk)
+    """
+    keys, datas, positions = [], [], []
+    for chunk in chunk_datas:
+        chunk_positions = []
+        for date in chunk:
+            key = period_key(date)
+            match = _match_period(key, keys, chunk_positions)
+            if match is None:
+                keys.append(key)
+                datas.append(date)
+                match = len(keys) - 1
+            elif len(key) > len(keys[match]):
+                keys[match], datas[match] = key, date
+            chunk_positions.append(match)
+        positions.append(chunk_positions)
+    return datas, positions
+
+# --- Merge --- #
+def _row_index(rows, row):
+    return next(i for i, other in enumerate(rows) if other is row)
+
+def _merge_section(chunk_entries, positions):
+    """
+    Deduplicate the entries of one section across chunks
+
+    Entries of different chunks with the same label whose values agree on their common periods
+    are one line item (pages repeated at a chunk boundary, or the same item read with fewer
+    periods); their values are combined. Repeated labels within one chunk are distinct items.
+    An item first seen in a later chunk goes right after the item preceding it in that chunk
+    (before the next one when it leads the chunk), so statement order is kept across chunks.
+    Returns:
+        List of (label, {merged period index: value}), in statement order
+    """
+    rows = [] # [key, label, values, chunks]
+    for chunk_index, (entries, chunk_positions) in enumerate(zip(chunk_entries, positions)):
+        placed = [] # (row matched in a previous chunk or None, row of the entry)
+        for entry in entries:
+            label, tokens = split_entry(str(entry))
+            # Values beyond the chunk's dates keep their position
+            values = {
+                chunk_positions[i] if i < len(chunk_positions) else i: token for i, token in enumerate(tokens)
+            }
+            key = " ".join(normalize(label).split())
+            match = next((
+                row for row in rows
+                if row[0] == key and chunk_index not in row[3]
+                and all(row[2][period] == value for period, value in values.items() if period in row[2])
+            ), None)
+            if match is not None:
+                match[2].update(values)
+                match[3].add(chunk_index)
+            placed.append((match, [key, label, values, {chunk_index}]))
+
+        # Without any item in common with the previous chunks, the chunk's items follow theirs
+        first_match = next((match for match, _ in placed if match is not None), None)
+        position = len(rows) if first_match is None else _row_index(rows, first_match)
+        for match, row in placed:
+            if match is None:
+                rows.insert(position, row)
+                position += 1
+            else:
+                position = _row_index(rows, match) + 1
+    return [(label, values) for _, label, values, _ in rows]
+
+def _format_entry(label, values):
+    if not values:
+        return label
+    return f"{label}: " + ", ".join(values.get(period, MISSING_VALUE) for period in range(max(values) + 1))
+
+def merge_chunks(results):
+    """
+    Merge the DocumentStructure of each chunk into one, deterministically
+
+    Chunks are merged in page order, so the same chunk results always give the same document
+    whatever order the requests completed in. Periods are reconciled across chunks (refer to
+    reconcile_periods) and each entry's values are reordered to the merged `datas`.
+    """
+    datas, positions = reconcile_periods([result.datas for result in results])
+    return output.DocumentStructure(
+        empresa=most_common(result.empresa for result in results),
+        unidade_monetaria=most_common(result.unidade_monetaria for result in results),
+        datas=datas,
+        **{
+            section: [
+                _format_entry(label, values)
+                for label, values in _merge_section([getattr(result, section) for result in results], positions)
+            ]
+            for section in SECTIONS
+        },
+    )
+
+# --- Map-reduce extraction --- #
+async def extract_chunk(chunk, index, semaphore):
+    """Run the field extraction agent on one chunk."""
+    # Imported here so that merging chunk results does not load pydantic_ai or the LLM clients
+    from agents.extraction_agents import field_extraction_agent, field_extraction_prompt
+
+    async with semaphore:
+        with stage("llm_chunk", model=field_extraction_agent.model.model_name, chunk=index,
+                   pages=chunk.pages, tokens=chunk.tokens) as chunk_stage:
+            result = await field_extraction_agent.run(field_extraction_prompt, deps=chunk.text)
+            usage = result.usage()
+            chunk_stage.set(prompt_tokens=usage.request_tokens, completion_tokens=usage.response_tokens)
+    return result
+
+async def extract_chunked(page_texts, pages=None, max_tokens=chunking.MAX_CHUNK_TOKENS,
+                          max_concurrency=MAX_CONCURRENT_CHUNKS):
+    """
+    Extract a document too long for a single request, chunk by chunk, and merge the results
+
+    Args:
+        page_texts: Text of each page of the document
+        pages: Optional page numbers (0-based) to extract from, e.g. page_filter.select_pages(page_texts)
+        max_tokens: Token budget of each chunk's text (counted locally, refer to chunking.count_tokens)
+        max_concurrency: Chunk requests in flight at once
+    Returns:
+        Tuple (merged DocumentStructure, list of the agent run result of each chunk)
+    """
+    chunks = chunking.chunk_pages(page_texts, max_tokens, pages)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    runs = await asyncio.gather(*(extract_chunk(chunk, index, semaphore) for index, chunk in enumerate(chunks)))
+    return merge_chunks([run.data for run in runs]), runs
+
+def extract_chunked_sync(page_texts, pages=None, max_tokens=chunking.MAX_CHUNK_TOKENS,
+                         max_concurrency=MAX_CONCURRENT_CHUNKS):
+    return asyncio.run(extract_chunked(page_texts, pages, max_tokens, max_concurrency))
@@ -0,0 +1,35 @@
+# --- Custom modules for the project --- #
+from agents import generic_openai_agent as llm # Declares the OpenAI models that the agents will use
+from structured_output import output_classes as output # Declares the output classes that the agents will return
+
+# --- Python modules --- #
+import toml # for prompts
+from pydantic_ai import Agent, RunContext # AI models and agents
+
+# --- Load the prompts --- #
+prompts = toml.load("prompts/prompts.toml")
+
+# --- Build agents --- #
+# Agent to extract the fields from the pdf file. The result (result_type) is a DocumentStructure object, which is a structured representation of the fields we want to extract.
+# The system_prompt refers to the prompt that the agent will use to generate the fields.
+# This agent will later receive a dynamic system prompt, which will contain the extracted raw text from the pdf file (refer to @field_extraction_agent.system_prompt)
+field_extraction_agent = Agent(
+    model=llm.gpt_4o,
+    result_type=output.DocumentStructure,
+    model_settings={
+        "temperature": 0
+    },
+    system_prompt=prompts["system_prompts"]["extraction_agent_system_prompt"]
+)
+
+# --- Dynamic System Prompts --- #
+# Passes a dynamic prompt to the agent, containing the extracted text from the pdf file.
+@field_extraction_agent.system_prompt
+def get_raw_text_from_pdf(ctx: RunContext[str]) -> str:
+    return f"<raw-data>{ctx.deps}</raw-data>"
+
+# --- User prompts --- #
+field_extraction_prompt = """
+    Analise o texto fornecido e extraia
+    os dados conforme a instrução passada.
+    """
@@ -5,15 +5,43 @@ from dotenv import load_dotenv
 from openai import AsyncAzureOpenAI # in order to use Azure OpenAI API we must use the AsyncAzureOpenAI class
 from pydantic_ai.models.openai import OpenAIModel
 
+from agents import replay # record/replay stand-ins for the OpenAI client
+from agents import response_cache # persistent cache of chat completions
+
 # --- Load Environment Variables --- #
 load_dotenv()
 
+# --- Record / Replay Config --- #
+# LLM_MODE=live (default) calls Azure. LLM_MODE=record calls Azure and saves every response under LLM_CASSETTE_DIR.
+# LLM_MODE=replay serves the saved responses offline, with optional latency and failure injection (refer to agents/replay.py).
+llm_mode = os.getenv('LLM_MODE', 'live')
+cassette_dir = os.getenv('LLM_CASSETTE_DIR', 'data/llm_cassettes')
+
+# --- Response Cache Config --- #
+# In live mode, identical temperature 0 requests are served from .cache/llm (refer to agents/response_cache.py).
+# LLM_CACHE=off disables the cache, LLM_CACHE=refresh re-runs every request and overwrites its cached response.
+# LLM_CACHE_DIR, LLM_CACHE_TTL (seconds) and LLM_CACHE_MAX_BYTES tune it.
+llm_cache = os.getenv('LLM_CACHE', 'on')
+
 # --- Azure OpenAI Config --- #
-client = AsyncAzureOpenAI(
-    api_key=os.getenv('AZURE_OPENAI_API_KEY'),
-    api_version=os.getenv('AZURE_OPENAI_API_VERSION'),
-    azure_endpoint=os.getenv('AZURE_ENDPOINT'),
-)
+if llm_mode == 'replay':
+    client = replay.ReplayClient(
+        cassette_dir,
+        latency=float(os.environ['LLM_REPLAY_LATENCY']) if os.getenv('LLM_REPLAY_LATENCY') else None,
+        jitter=float(os.getenv('LLM_REPLAY_JITTER', 0)),
+        failure_rate=float(os.getenv('LLM_REPLAY_FAILURE_RATE', 0)),
+        seed=int(os.environ['LLM_REPLAY_SEED']) if os.getenv('LLM_REPLAY_SEED') else None,
+    )
+else:
+    client = AsyncAzureOpenAI(
+        api_key=os.getenv('AZURE_OPENAI_API_KEY'),
+        api_version=os.getenv('AZURE_OPENAI_API_VERSION'),
+        azure_endpoint=os.getenv('AZURE_ENDPOINT'),
+    )
+    if llm_mode == 'record':
+        client = replay.RecordingClient(client, cassette_dir)
+    elif llm_cache != 'off':
+        client = response_cache.CachingClient(client, refresh=llm_cache == 'refresh')
 
 # --- Models --- #
 gpt_4o_mini = OpenAIModel(
@@ -0,0 +1,9 @@
+# --- Imports --- #
+from collections import Counter
+
+# --- Merging partial results --- #
+# Shared by the per-section merge (section_agents) and the per-chunk merge (chunked_extraction)
+def most_common(values):
+    """Most frequent non-empty value, e.g. the company name most partial results agree on. "" when all are empty."""
+    values = [value for value in values if value]
+    return Counter(values).most_common(1)[0][0] if values else ""
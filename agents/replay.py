@@ -0,0 +1,143 @@
+# --- Imports --- #
+import json
+import time
+import random
+import asyncio
+import hashlib
+from pathlib import Path
+from dataclasses import dataclass
+
+import httpx
+import openai
+from openai.types.chat import ChatCompletion
+
+# --- Cassettes --- #
+# Request arguments that do not change the model's answer and are left out of the key
+_IGNORED_ARGS = {"timeout", "extra_headers", "extra_query", "extra_body"}
+
+def _request_args(kwargs):
+    return {
+        key: value for key, value in kwargs.items()
+        if key not in _IGNORED_ARGS and not isinstance(value, openai.NotGiven)
+    }
+
+def request_key(kwargs):
+    """Hash of the arguments of a chat completion request."""
+    payload = json.dumps(_request_args(kwargs), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class Cassette:
+    """Folder of recorded chat completions, one JSON file per request."""
+
+    def __init__(self, cassette_dir):
+        self.cassette_dir = Path(cassette_dir)
+
+    def _path(self, key):
+        return self.cassette_dir / f"{key}.json"
+
+    def save(self, kwargs, completion, latency):
+        self.cassette_dir.mkdir(parents=True, exist_ok=True)
+        record = {
+            "request": _request_args(kwargs),
+            "response": completion.model_dump(mode="json"),
+            "latency": latency,
+        }
+        with self._path(request_key(kwargs)).open("w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2, default=str)
+
+    def load(self, kwargs):
+        path = self._path(request_key(kwargs))
+        if not path.exists():
+            raise LookupError(
+                f"No recorded response for this request in {self.cassette_dir}. "
+                "Run once with LLM_MODE=record to record it."
+            )
+        with path.open(encoding="utf-8") as f:
+            record = json.load(f)
+        return ChatCompletion.model_validate(record["response"]), record["latency"]
+
+# --- Stand-in clients --- #
+# OpenAIModel only uses `client.chat.completions.create` (and `client.base_url`), so
+# these small objects can be passed as `openai_client` in place of AsyncAzureOpenAI.
+class _Completions:
+    def __init__(self, create):
+        self.create = create
+
+class _Chat:
+    def __init__(self, create):
+        self.completions = _Completions(create)
+
+class RecordingClient:
+    """Wraps a real OpenAI client and records every chat completion to a cassette."""
+
+    def __init__(self, client, cassette_dir):
+        self._client = client
+        self.cassette = Cassette(cassette_dir)
+        self.chat = _Chat(self._create)
+
+    async def _create(self, **kwargs):
+        start = time.perf_counter()
+        completion = await self._client.chat.completions.create(**kwargs)
+        self.cassette.save(kwargs, completion, time.perf_counter() - start)
+        return completion
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+@dataclass
+class ReplayStats:
+    calls: int = 0
+    failures: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+class ReplayClient:
+    """
+    Serves recorded chat completions offline
+
+    Latency is either a fixed number of seconds or, when `latency` is None, the latency
+    measured at recording time, times `latency_scale`. A share of the calls
+    (`failure_rate`) fails with a rate limit or a timeout error, as the real API would, and
+    the first `fail_first` calls always fail with a rate limit.
+    """
+
+    base_url = httpx.URL("http://replay.local/")
+
+    def __init__(self, cassette_dir, latency=None, latency_scale=1.0, jitter=0.0, failure_rate=0.0, seed=None,
+                 fail_first=0):
+        self.cassette = Cassette(cassette_dir)
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.fail_first = fail_first
+        self.random = random.Random(seed)
+        self.stats = ReplayStats()
+        self.chat = _Chat(self._create)
+
+    def _failure(self, rate_limit=False):
+        request = httpx.Request("POST", self.base_url.join("chat/completions"))
+        if rate_limit or self.random.random() < 0.5:
+            response = httpx.Response(429, request=request)
+            return openai.RateLimitError("Injected rate limit", response=response, body=None)
+        return openai.APITimeoutError(request=request)
+
+    async def _create(self, **kwargs):
+        completion, recorded_latency = self.cassette.load(kwargs)
+        latency = recorded_latency * self.latency_scale if self.latency is None else self.latency
+        latency += self.random.uniform(0, self.jitter)
+
+        self.stats.calls += 1
+        self.stats.in_flight += 1
+        self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+        try:
+            await asyncio.sleep(latency)
+            if self.stats.failures < self.fail_first:
+                self.stats.failures += 1
+                raise self._failure(rate_limit=True)
+            if self.random.random() < self.failure_rate:
+                self.stats.failures += 1
+                raise self._failure()
+            return completion
+        finally:
+            self.stats.in_flight -= 1
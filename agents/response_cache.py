@@ -0,0 +1,150 @@
+# --- Imports --- #
+import os
+import json
+import time
+import tempfile
+import contextvars
+from pathlib import Path
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from openai.types.chat import ChatCompletion
+
+from agents.replay import request_key, _Chat
+
+# --- Config --- #
+DEFAULT_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".cache/llm")
+DEFAULT_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+DEFAULT_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600)) # seconds
+
+# Set inside `bypass_cache()`: requests skip the cache lookup but still store their fresh response
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+@contextmanager
+def bypass_cache():
+    """Re-run the requests made inside this block against the model and refresh their cached responses."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+# --- Cache --- #
+@dataclass
+class ResponseCacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    expired: int = 0
+    evictions: int = 0
+
+class ResponseCache:
+    """
+    On-disk cache of chat completions
+
+    Entries are JSON files named after the hash of every request argument (refer to
+    agents.replay.request_key): model, settings such as temperature and the response format,
+    and the messages, i.e. the system prompt as currently written in prompts.toml, the user
+    prompt and the document text. Changing any of them is a miss, so editing one prompt only
+    re-runs the requests using it. Entries older than `ttl` seconds are expired, and writes
+    evict the least recently used entries until the cache fits in `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = ResponseCacheStats()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key):
+        """Returns the cached completion for `key`, or None."""
+        path = self._path(key)
+        try:
+            with path.open(encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.stats.misses += 1
+            return None
+
+        if self.ttl and time.time() - entry["created"] > self.ttl:
+            path.unlink(missing_ok=True)
+            self.stats.expired += 1
+            self.stats.misses += 1
+            return None
+
+        os.utime(path) # mark as recently used
+        self.stats.hits += 1
+        return ChatCompletion.model_validate(entry["response"])
+
+    def put(self, key, completion, model=None, latency=None):
+        """Stores `completion` under `key` and evicts old entries if the cache is full."""
+        entry = {
+            "created": time.time(),
+            "model": model,
+            "latency": latency,
+            "response": completion.model_dump(mode="json"),
+        }
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, self._path(key))
+        self.stats.writes += 1
+        self.evict()
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        entries = [(path.stat(), path) for path in self.cache_dir.glob("*.json")]
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, path in sorted(entries, key=lambda item: item[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            self.stats.evictions += 1
+
+    def clear(self):
+        """Deletes every cached entry."""
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+# --- Caching client --- #
+def is_cacheable(kwargs):
+    """Only deterministic (temperature 0), non-streamed requests are cached."""
+    return kwargs.get("temperature") == 0 and not kwargs.get("stream")
+
+class CachingClient:
+    """
+    Wraps an OpenAI client and serves repeated chat completions from a ResponseCache
+
+    Like the replay clients, it can be passed as `openai_client` to OpenAIModel. With
+    `refresh`, every request bypasses the lookup and refreshes its cached response.
+    """
+
+    def __init__(self, client, cache=None, refresh=False):
+        self._client = client
+        self.cache = cache or ResponseCache()
+        self.refresh = refresh
+        self.chat = _Chat(self._create)
+
+    async def _create(self, **kwargs):
+        if not is_cacheable(kwargs):
+            return await self._client.chat.completions.create(**kwargs)
+
+        key = request_key(kwargs)
+        if not (self.refresh or _bypass.get()):
+            completion = self.cache.get(key)
+            if completion is not None:
+                return completion
+
+        start = time.perf_counter()
+        completion = await self._client.chat.completions.create(**kwargs)
+        self.cache.put(key, completion, model=kwargs.get("model"), latency=time.perf_counter() - start)
+        return completion
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
@@ -0,0 +1,92 @@
+# --- Custom modules for the project --- #
+from agents import generic_openai_agent as llm # Declares the OpenAI models that the agents will use
+from agents.extraction_agents import prompts # Prompts loaded from prompts.toml
+from structured_output import output_classes as output # Declares the output classes that the agents will return
+from pdf_parsing import page_filter # Picks the pages of each section
+from tracing.stage_tracing import stage # Times each section request
+from agents.merging import most_common # Company and unit most sections agree on
+
+# --- Python modules --- #
+import asyncio
+from pydantic_ai import Agent # AI models and agents
+
+# --- Section prompts --- #
+# DocumentStructure field -> (table, key) of its extraction prompt in prompts.toml
+SECTION_PROMPTS = {
+    "ativo_circulante": ("ativo_circulante", "extract_ac"),
+    "ativo_nao_circulante": ("ativo_nao_circulate", "extract_anc"),
+    "passivo_circulante": ("passivo_circulante", "extract_pc"),
+    "passivo_nao_circulante": ("passivo_nao_circulante", "extract_pnc"),
+    "patrimonio_liquido": ("patrimonio_liquido", "extract_pl"),
+    "demonstracao_do_resultado": ("dre", "extract_dre"),
+}
+
+def section_prompt(section, text):
+    """The section's extract_* prompt with the section's pages in place of {text}."""
+    table, key = SECTION_PROMPTS[section]
+    return prompts[table][key].replace("{text}", text)
+
+# --- Build agents --- #
+# One small agent per section, sharing the section system prompt. Each returns a SectionExtraction,
+# which only holds the items of its own section. Agents are built on first use, per model.
+_agents = {}
+
+def section_agent(section, model=None):
+    model = model or llm.gpt_4o
+    key = (section, model.model_name)
+    if key not in _agents:
+        _agents[key] = Agent(
+            model=model,
+            result_type=output.SectionExtraction,
+            model_settings={
+                "temperature": 0
+            },
+            system_prompt=prompts["section_agents"]["section_agent_system_prompt"]
+        )
+    return _agents[key]
+
+# --- Fan-out extraction --- #
+def merge_sections(results):
+    """
+    Merge the per-section results into a DocumentStructure
+
+    Company and monetary unit are the ones most sections agree on. Dates are taken from the
+    section reporting the most of them (the balance sheet and the DRE may differ in format).
+    """
+    datas = max((result.datas for result in results.values()), key=len, default=[])
+    return output.DocumentStructure(
+        empresa=most_common(result.empresa for result in results.values()),
+        unidade_monetaria=most_common(result.unidade_monetaria for result in results.values()),
+        datas=datas,
+        **{section: results[section].itens if section in results else [] for section in SECTION_PROMPTS},
+    )
+
+async def extract_section(section, page_texts, model=None):
+    """Run one section agent on the pages of that section only."""
+    agent = section_agent(section, model)
+    text = page_filter.filter_section_text(page_texts, section)
+    with stage("llm_section", model=agent.model.model_name, section=section) as section_stage:
+        result = await agent.run(section_prompt(section, text))
+        usage = result.usage()
+        section_stage.set(prompt_tokens=usage.request_tokens, completion_tokens=usage.response_tokens)
+    return result
+
+async def extract_sections(page_texts, model=None, sections=None):
+    """
+    Extract every section concurrently and merge the results
+
+    Latency is that of the slowest section instead of one long generation over the whole document.
+    Args:
+        page_texts: Text of each page of the document
+        model: Model of the section agents (e.g. llm.gpt_4o_mini). Defaults to gpt-4o
+        sections: Sections to extract. Defaults to every DocumentStructure section
+    Returns:
+        Tuple (DocumentStructure, dict mapping each section to its agent run result)
+    """
+    sections = list(sections or SECTION_PROMPTS)
+    runs = await asyncio.gather(*(extract_section(section, page_texts, model) for section in sections))
+    results = dict(zip(sections, runs))
+    return merge_sections({section: run.data for section, run in results.items()}), results
+
+def extract_sections_sync(page_texts, model=None, sections=None):
+    return asyncio.run(extract_sections(page_texts, model, sections))
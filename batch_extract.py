@@ -0,0 +1,244 @@
+"""
+Batch field extraction over many PDFs
+
+Parses documents on a process pool while field extraction requests run
+concurrently against the LLM, bounded by a concurrency limit and a
+token-per-minute budget. Writes one JSON line per document.
+
+Usage:
+    python batch_extract.py data/ --output results.jsonl
+    python batch_extract.py manifest.txt --concurrency 8 --tpm 300000
+"""
+# --- Python modules --- #
+import os
+import json
+import time
+import asyncio
+import argparse
+from functools import partial
+from contextlib import nullcontext
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+# --- Custom modules for the project --- #
+from pdf_parsing import page_extraction
+from pdf_parsing import cache as extraction_cache
+from pdf_parsing import page_filter
+from pdf_parsing.page_filter import estimate_tokens
+from tracing.stage_tracing import enable_file_sink, stage, start_run
+
+# --- Inputs --- #
+def collect_pdfs(source):
+    """
+    List the PDFs to process
+
+    Args:
+        source: A directory (every *.pdf in it, recursively) or a manifest file with
+            one path per line (.txt) or one {"path": ...} object per line (.jsonl).
+            Relative paths in a manifest are resolved against the manifest's folder.
+    Returns:
+        List of PDF paths
+    """
+    source = Path(source)
+    if source.is_dir():
+        return sorted(str(path) for path in source.rglob("*.pdf"))
+
+    paths = []
+    with source.open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = Path(json.loads(line)["path"] if source.suffix == ".jsonl" else line)
+            paths.append(str(path if path.is_absolute() else source.parent / path))
+    return paths
+
+def parse_document(pdf_path, parser="pypdf", prefilter=False, use_cache=None):
+    """
+    Extract the raw text of a PDF, optionally keeping only its financial statement pages. Runs in a worker process.
+
+    Page texts come from the extraction cache unless `use_cache` is False (refer to pdf_parsing/cache.py).
+    """
+    start_run(document=pdf_path)
+    page_texts = extraction_cache.extract_pages(pdf_path, parser=parser, workers=1, use_cache=use_cache)
+    text = page_filter.filter_text(page_texts) if prefilter else page_extraction.join_pages(page_texts)
+    return text, estimate_tokens(page_extraction.join_pages(page_texts))
+
+# --- Rate limiting --- #
+class TokenRateLimiter:
+    """
+    Token-per-minute budget shared by every in-flight request
+
+    A token bucket refilled continuously at `tokens_per_minute`. Requests wait, in
+    arrival order, until the bucket holds their estimated token count.
+    """
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = tokens_per_minute
+        self.tokens = tokens_per_minute
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    async def acquire(self, tokens):
+        # A single request larger than the whole budget waits for a full bucket
+        tokens = min(tokens, self.capacity)
+        async with self.lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) * 60 / self.capacity)
+                self._refill()
+            self.tokens -= tokens
+
+# --- Retries --- #
+def is_retryable(error):
+    """
+    Whether an LLM call failed on a transient error: rate limit (429), server error (5xx), timeout or connection
+
+    pydantic_ai re-raises the client's 4xx/5xx errors as ModelHTTPError, so both forms are checked.
+    """
+    import openai
+
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    try:
+        from pydantic_ai.exceptions import ModelHTTPError
+    except ImportError:
+        return False
+    return isinstance(error, ModelHTTPError) and (error.status_code == 429 or error.status_code >= 500)
+
+async def run_with_retries(run, retries=3, backoff=2.0):
+    """
+    Await `run()`, retrying transient errors (see is_retryable) with exponential backoff
+
+    Returns:
+        Tuple (result, number of retries)
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await run(), attempt
+        except Exception as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+            await asyncio.sleep(backoff ** attempt)
+
+# --- Pipeline --- #
+async def process_document(pdf_path, parse, executor, semaphore, limiter, retries=3):
+    """Parse one PDF on the process pool, then run field extraction on it."""
+    # Imported here so that parsing workers never load pydantic_ai or the LLM clients
+    from agents.extraction_agents import field_extraction_agent, field_extraction_prompt, prompts
+
+    record = {"pdf": pdf_path}
+    loop = asyncio.get_running_loop()
+    try:
+        start = time.perf_counter()
+        text, document_tokens = await loop.run_in_executor(executor, parse, pdf_path)
+        record["parse_seconds"] = time.perf_counter() - start
+        record["characters"] = len(text)
+        record["document_tokens"] = document_tokens
+        record["prompt_text_tokens"] = estimate_tokens(text)
+
+        async with semaphore:
+            if limiter:
+                system_prompt = prompts["system_prompts"]["extraction_agent_system_prompt"]
+                await limiter.acquire(estimate_tokens(system_prompt + field_extraction_prompt + text))
+            start = time.perf_counter()
+            with stage("llm_extraction", document=pdf_path, model=field_extraction_agent.model.model_name) as llm_stage:
+                result, record["retries"] = await run_with_retries(
+                    lambda: field_extraction_agent.run(field_extraction_prompt, deps=text), retries
+                )
+                usage = result.usage()
+                llm_stage.set(
+                    retries=record["retries"],
+                    prompt_tokens=usage.request_tokens,
+                    completion_tokens=usage.response_tokens,
+                )
+            record["llm_seconds"] = time.perf_counter() - start
+
+        record["usage"] = {
+            "request_tokens": usage.request_tokens,
+            "response_tokens": usage.response_tokens,
+            "total_tokens": usage.total_tokens,
+        }
+        record["status"] = "ok"
+        record["result"] = result.data.model_dump()
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+async def run_batch(pdf_paths, output_path, parser="pypdf", parse_workers=None, concurrency=4, tokens_per_minute=None,
+                    prefilter=False, retries=3, export_dir=None, use_cache=None):
+    """
+    Run field extraction over many PDFs, writing one JSON line per document as it finishes
+
+    Args:
+        pdf_paths: PDFs to process
+        output_path: JSONL file the results are appended to
+        parser: page_extraction parser used to get the raw text
+        parse_workers: Size of the parsing process pool. Defaults to os.cpu_count()
+        concurrency: Maximum number of LLM requests in flight
+        tokens_per_minute: Optional token budget shared by all LLM requests
+        prefilter: Only send the balance sheet and income statement pages to the LLM
+        retries: Retries of a request failing with a rate limit, timeout or connection error
+        export_dir: Optional Parquet dataset the line items of each result are also appended to
+            (refer to structured_output/columnar_export.py)
+        use_cache: Serve page texts from the extraction cache. Defaults to on unless EXTRACTION_CACHE=off
+    Returns:
+        Number of documents that failed
+    """
+    # Each worker parses one whole document; parallelism comes from running many documents at once
+    parse = partial(parse_document, parser=parser, prefilter=prefilter, use_cache=use_cache)
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = TokenRateLimiter(tokens_per_minute) if tokens_per_minute else None
+
+    if export_dir:
+        from structured_output.columnar_export import ColumnarExporter
+        exporter = ColumnarExporter(export_dir)
+    else:
+        exporter = nullcontext()
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=parse_workers or os.cpu_count()) as executor, \
+            open(output_path, "a", encoding="utf-8") as out, exporter:
+        tasks = [process_document(path, parse, executor, semaphore, limiter, retries) for path in pdf_paths]
+        for done in asyncio.as_completed(tasks):
+            record = await done
+            failures += record["status"] != "ok"
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+            if export_dir and record["status"] == "ok":
+                exporter.add_document(record["result"], documento=record["pdf"])
+            print(f"[{record['status']}] {record['pdf']}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Directory of PDFs or manifest file (.txt / .jsonl)")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file to append results to")
+    parser.add_argument("--parser", default="pypdf", choices=sorted(page_extraction.PARSERS))
+    parser.add_argument("--parse-workers", type=int, default=None, help="Parsing processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum LLM requests in flight")
+    parser.add_argument("--tpm", type=int, default=None, help="Token-per-minute budget for the LLM requests")
+    parser.add_argument("--prefilter", action="store_true", help="Only send balance sheet and DRE pages to the LLM")
+    parser.add_argument("--retries", type=int, default=3, help="Retries on rate limit / timeout / connection errors")
+    parser.add_argument("--export-dir", default=None, help="Also append the line items to this Parquet dataset")
+    parser.add_argument("--no-cache", action="store_true", help="Re-parse every document instead of using the extraction cache")
+    args = parser.parse_args()
+
+    enable_file_sink()
+    pdf_paths = collect_pdfs(args.source)
+    print(f"Processing {len(pdf_paths)} documents")
+    failures = asyncio.run(
+        run_batch(pdf_paths, args.output, args.parser, args.parse_workers, args.concurrency, args.tpm, args.prefilter, args.retries,
+                  args.export_dir, use_cache=False if args.no_cache else None)
+    )
+    print(f"Done: {len(pdf_paths) - failures} succeeded, {failures} failed")
+    raise SystemExit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: layout engine (pdf_parsing.layout) vs. the section_markers page extractor
+
+For each page of the sample PDFs, both extractors run on a freshly opened pdfplumber page
+(so no cached chars or words are shared between them). Reports the time per page, the
+estimated tokens sent to the LLM, and the recall of the ground truth labels and values.
+
+Usage:
+    python -m benchmarks.bench_layout
+    python -m benchmarks.bench_layout data/monark.pdf --show 2
+"""
+import time
+import argparse
+from pathlib import Path
+
+from pdf_parsing import pdf_parser
+from pdf_parsing.page_filter import estimate_tokens
+from benchmarks.parser_benchmark import load_ground_truth, score
+
+EXTRACTORS = {
+    "section_markers": pdf_parser.section_markers_page_text,
+    "layout": pdf_parser.layout_page_text,
+}
+
+def run_extractor(extract, pdf_path):
+    """Extracts every page of `pdf_path`, returning the page texts and the seconds spent on each."""
+    import pdfplumber
+
+    texts, seconds = [], []
+    with pdfplumber.open(pdf_path) as reader:
+        n_pages = len(reader.pages)
+    for page_number in range(n_pages):
+        with pdfplumber.open(pdf_path) as reader:
+            page = reader.pages[page_number]
+            start = time.perf_counter()
+            texts.append(extract(page))
+            seconds.append(time.perf_counter() - start)
+    return texts, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", default=["data/monark.pdf", "data/esferatur.pdf"])
+    parser.add_argument("--ground-truth", default="data/ground_truth.xlsx")
+    parser.add_argument("--show", type=int, default=None, help="Print the text of this page (0-based) for each extractor")
+    args = parser.parse_args()
+
+    ground_truth = load_ground_truth(args.ground_truth) if Path(args.ground_truth).exists() else {}
+
+    print(f"{'pdf':<16}{'extractor':<18}{'ms/page':>9}{'tokens':>9}{'labels':>9}{'values':>9}")
+    for pdf_path in args.pdfs:
+        name = Path(pdf_path).name
+        for extractor, extract in EXTRACTORS.items():
+            texts, seconds = run_extractor(extract, pdf_path)
+            text = "".join(texts)
+            recall = score(text, ground_truth[name]) if name in ground_truth else {}
+            label_recall, value_recall = recall.get("label_recall"), recall.get("value_recall")
+            print(
+                f"{name:<16}{extractor:<18}{1000 * sum(seconds) / len(seconds):>9.1f}{estimate_tokens(text):>9}"
+                f"{label_recall if label_recall is not None else float('nan'):>9.2f}"
+                f"{value_recall if value_recall is not None else float('nan'):>9.2f}"
+            )
+            if args.show is not None and args.show < len(texts):
+                print(texts[args.show])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Offline throughput benchmark of the batch extraction pipeline
+
+Replays recorded LLM responses (see agents/replay.py) so runs are reproducible and
+need no Azure access. Record the cassettes once with a live run:
+
+    LLM_MODE=record python batch_extract.py data/ --output /tmp/record.jsonl
+
+then benchmark with different concurrency limits, latencies and failure rates:
+
+    python -m benchmarks.bench_pipeline data/ --concurrency 1 4 16 --latency 2 --failure-rate 0.1
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Directory of PDFs or manifest file, as for batch_extract.py")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency", type=float, default=None, help="Fixed LLM latency (default: recorded latency)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--prefilter", action="store_true")
+    parser.add_argument("--cassettes", default=os.getenv("LLM_CASSETTE_DIR", "data/llm_cassettes"))
+    args = parser.parse_args()
+
+    # The LLM client is built from these variables on first import of the agents
+    os.environ["LLM_MODE"] = "replay"
+    os.environ["LLM_CASSETTE_DIR"] = args.cassettes
+    os.environ["LLM_REPLAY_JITTER"] = str(args.jitter)
+    os.environ["LLM_REPLAY_FAILURE_RATE"] = str(args.failure_rate)
+    os.environ["LLM_REPLAY_SEED"] = "0"
+    if args.latency is not None:
+        os.environ["LLM_REPLAY_LATENCY"] = str(args.latency)
+
+    import batch_extract
+    from agents import generic_openai_agent as llm
+
+    pdf_paths = batch_extract.collect_pdfs(args.source)
+    print(f"{len(pdf_paths)} documents, failure rate {args.failure_rate:.0%}")
+    print(f"{'concurrency':>12}{'seconds':>10}{'docs/s':>9}{'max in flight':>15}{'retries':>9}{'failed':>8}")
+
+    for concurrency in args.concurrency:
+        llm.client.stats = type(llm.client.stats)()
+        with tempfile.TemporaryDirectory() as tmp:
+            output_path = os.path.join(tmp, "results.jsonl")
+            start = time.perf_counter()
+            failures = asyncio.run(batch_extract.run_batch(
+                pdf_paths, output_path, concurrency=concurrency, prefilter=args.prefilter, retries=args.retries
+            ))
+            elapsed = time.perf_counter() - start
+            with open(output_path, encoding="utf-8") as f:
+                retries = sum(json.loads(line).get("retries", 0) for line in f)
+
+        print(
+            f"{concurrency:>12}{elapsed:>10.2f}{len(pdf_paths) / elapsed:>9.2f}"
+            f"{llm.client.stats.max_in_flight:>15}{retries:>9}{failures:>8}"
+        )
+
+if __name__ == "__main__":
+    main()
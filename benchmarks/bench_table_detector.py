@@ -0,0 +1,153 @@
+"""
+Accuracy vs. speed report of the TableDetector inference backends on CPU
+
+Renders every page of the sample PDFs once, runs each backend over all of them and compares
+its detections with the fp32 PyTorch ("torch") backend: a detection matches a reference
+table when their IoU is at least --match-iou. Reports the model load time, the time per page
+and the recall/precision of the reference tables, with the mean IoU of the matches.
+
+With --planned, every backend also runs on pages rendered at the detection resolution of
+pdf_parsing/render_planner.py and is compared with the reference at --dpi. Boxes are compared
+in PDF points, so renders of different resolutions match.
+
+Usage:
+    python -m benchmarks.bench_table_detector
+    python -m benchmarks.bench_table_detector data/vamos.pdf --backends torch onnx_int8 --threads 4 --output report.json
+    python -m benchmarks.bench_table_detector --backends torch --planned
+"""
+import json
+import time
+import argparse
+from glob import glob
+
+import numpy as np
+
+from box_postprocessing import pairwise_iou, to_numpy
+from table_detection import BACKENDS, TableDetector
+
+def render_pages(pdf_paths, dpi):
+    """
+    RGB arrays of every page of the PDFs
+
+    Args:
+        pdf_paths: PDF files
+        dpi: Render resolution. None renders each page at its planned detection resolution
+    Returns:
+        Tuple (images, (pdf, page number) label of each image, resolution of each image)
+    """
+    import fitz
+    from table_pipeline import render_page_array
+    from pdf_parsing.render_planner import plan_page
+
+    images, labels, resolutions = [], [], []
+    for pdf_path in pdf_paths:
+        with fitz.open(pdf_path) as pdf_document:
+            for page_number in range(pdf_document.page_count):
+                page = pdf_document.load_page(page_number)
+                page_dpi = dpi or plan_page(page).detection_dpi
+                images.append(render_page_array(page, page_dpi))
+                labels.append((pdf_path, page_number))
+                resolutions.append(page_dpi)
+    return images, labels, resolutions
+
+def to_points(results, resolutions):
+    """Detection results with their boxes converted from pixels to PDF points."""
+    return [
+        {**page_results, "boxes": to_numpy(page_results["boxes"]) * (72 / dpi)}
+        for page_results, dpi in zip(results, resolutions)
+    ]
+
+def match_detections(reference, detections, match_iou=0.5):
+    """
+    Greedily match the boxes of one page to the reference boxes, by decreasing IoU
+
+    Returns:
+        Tuple (number of matches, of reference boxes and of detected boxes, IoU of each match)
+    """
+    reference_boxes, boxes = to_numpy(reference["boxes"]), to_numpy(detections["boxes"])
+    if not len(reference_boxes) or not len(boxes):
+        return 0, len(reference_boxes), len(boxes), []
+    ious = pairwise_iou(reference_boxes, boxes)
+    matched = []
+    while ious.size and ious.max() >= match_iou:
+        i, j = np.unravel_index(ious.argmax(), ious.shape)
+        matched.append(float(ious[i, j]))
+        ious[i, :], ious[:, j] = -1, -1
+    return len(matched), len(reference_boxes), len(boxes), matched
+
+def compare(reference_results, results, match_iou=0.5):
+    """Recall and precision of the reference tables over all pages, and mean IoU of the matches."""
+    matched = references = detected = 0
+    ious = []
+    for reference, detections in zip(reference_results, results):
+        page_matched, page_references, page_detected, page_ious = match_detections(reference, detections, match_iou)
+        matched, references, detected = matched + page_matched, references + page_references, detected + page_detected
+        ious.extend(page_ious)
+    return {
+        "tables": detected,
+        "recall": matched / references if references else None,
+        "precision": matched / detected if detected else None,
+        "mean_iou": float(np.mean(ious)) if ious else None,
+    }
+
+def run_backend(backend, images, threads=None, batch_size=4):
+    """Load a backend, warm it up on one page and time the detection of every page."""
+    detector = TableDetector(backend=backend, num_threads=threads, batch_size=batch_size)
+    start = time.perf_counter()
+    detector.load()
+    load_seconds = time.perf_counter() - start
+    detector.detect(images[:1])
+
+    start = time.perf_counter()
+    results = detector.detect(images)
+    seconds = time.perf_counter() - start
+    return results, {"backend": backend, "load_seconds": load_seconds, "seconds_per_page": seconds / len(images)}
+
+def _fmt(value, spec):
+    return format(value, spec) if value is not None else "-"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", default=sorted(glob("data/*.pdf")))
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS,
+                        help="Backends to compare. The first one is the accuracy reference")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads of the forward pass")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--dpi", type=int, default=300, help="Render resolution, as in table_pipeline")
+    parser.add_argument("--match-iou", type=float, default=0.5)
+    parser.add_argument("--planned", action="store_true",
+                        help="Also run every backend on pages rendered at their planned detection resolution")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    renders = [(str(args.dpi), *render_pages(args.pdfs, args.dpi))]
+    if args.planned:
+        renders.append(("planned", *render_pages(args.pdfs, None)))
+    labels = renders[0][2]
+    print(f"{len(labels)} pages from {len(args.pdfs)} PDFs, reference backend: {args.backends[0]} at {args.dpi} dpi\n")
+
+    report, reference_results = [], None
+    print(f"{'backend':<20}{'load s':>9}{'s/page':>9}{'speedup':>9}{'tables':>8}{'recall':>8}{'precision':>11}{'IoU':>7}")
+    for resolution, images, _, resolutions in renders:
+        for backend in args.backends:
+            results, row = run_backend(backend, images, args.threads, args.batch_size)
+            results = to_points(results, resolutions)
+            if reference_results is None:
+                reference_results, reference_seconds = results, row["seconds_per_page"]
+            row.update(compare(reference_results, results, args.match_iou))
+            row["speedup"] = reference_seconds / row["seconds_per_page"]
+            row["dpi"] = resolution
+            report.append(row)
+            name = f"{backend}@{resolution}"
+            print(
+                f"{name:<20}{row['load_seconds']:>9.1f}{row['seconds_per_page']:>9.3f}{row['speedup']:>9.2f}"
+                f"{row['tables']:>8}{_fmt(row['recall'], '.3f'):>8}{_fmt(row['precision'], '.3f'):>11}"
+                f"{_fmt(row['mean_iou'], '.3f'):>7}"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"pdfs": args.pdfs, "pages": len(labels), "threads": args.threads, "backends": report}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Startup time check of the text extraction path
+
+Imports each module in a fresh interpreter with `python -X importtime`, keeps the best of
+a few runs and fails (exit code 1) when a module exceeds its budget or pulls in a heavy
+backend (torch, transformers, matplotlib, fitz...) that it should only load on first use.
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --runs 5 --show 10
+"""
+import sys
+import argparse
+import subprocess
+
+# Cumulative import time budget of each module, in milliseconds
+BUDGETS = {
+    "pdf_parsing.page_extraction": 60,
+    "pdf_parsing.pdf_parser": 60,
+    "pdf_parsing.page_filter": 30,
+    "pdf_parsing.cache": 80,
+    "pdf_table_extractor": 30,
+    "pdf_parsing.docling_backend": 60,
+    "table_detection": 150,
+    "batch_extract": 100,
+}
+
+# Backends that must only be imported when used
+HEAVY_MODULES = {
+    "torch", "transformers", "matplotlib", "fitz", "pymupdf", "pdfplumber", "PyPDF2", "pypdf",
+    "pytesseract", "PIL", "pandas", "pydantic_ai", "logfire", "openai", "docling", "onnxruntime",
+}
+
+def import_times(module):
+    """
+    Import `module` in a fresh interpreter
+
+    Returns:
+        Dict mapping every module imported along the way to its cumulative import time, in ms
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            times[name.strip()] = int(cumulative) / 1000
+        except ValueError: # header line
+            continue
+    return times
+
+def check(module, runs=3):
+    """Best of `runs` import times of a module and the heavy backends it imported."""
+    best = None
+    for _ in range(runs):
+        times = import_times(module)
+        if best is None or times[module] < best[module]:
+            best = times
+    heavy = sorted(name for name in best if name.split(".")[0] in HEAVY_MODULES and "." not in name)
+    return best, heavy
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS), help="Modules to check (default: every budgeted module)")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per module, the best one is kept")
+    parser.add_argument("--show", type=int, default=0, help="Also list the N slowest imports of each module")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<32}{'ms':>9}{'budget':>9}  heavy backends imported")
+    for module in args.modules:
+        budget = BUDGETS.get(module, float("inf"))
+        times, heavy = check(module, args.runs)
+        elapsed = times[module]
+        status = "" if elapsed <= budget and not heavy else "  FAIL"
+        print(f"{module:<32}{elapsed:>9.1f}{budget:>9.0f}  {', '.join(heavy) or '-'}{status}")
+        if args.show:
+            slowest = sorted(((ms, name) for name, ms in times.items() if name != module), reverse=True)
+            for ms, name in slowest[:args.show]:
+                print(f"    {name:<40}{ms:>9.1f}")
+        if status:
+            failures.append(module)
+
+    if failures:
+        print(f"\nOver budget or importing heavy backends: {', '.join(failures)}")
+    raise SystemExit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Speed and accuracy benchmark of the parsing backends against data/ground_truth.xlsx
+
+Runs every backend over every sample PDF, each run in a fresh process, and records
+wall time, CPU time, peak RSS and pages/sec. Imports and model loading happen before the
+timed region and are reported apart, as warm-up seconds. The extracted text is scored against
+the line items and values of the ground truth sheet named after the PDF.
+
+Usage:
+    python -m benchmarks.parser_benchmark --output parser_benchmark.json
+    python -m benchmarks.parser_benchmark --backends pypdf pdfplumber --baseline parser_benchmark.json
+"""
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+# --- Backends --- #
+# Each backend is a (warm, run) pair: warm imports its libraries and loads its models, so that
+# the timed run measures parsing only, whichever backend the worker process starts with.
+def _pdf_parser_backend(parser):
+    def warm():
+        from pdf_parsing import page_extraction
+        page_extraction.load_parser(parser)
+
+    def run(pdf_path):
+        from pdf_parsing import page_extraction
+        return page_extraction.extract_text(pdf_path, parser=parser, workers=1)
+    return warm, run
+
+def _format_tables(tables):
+    return "\n".join(" ".join(cell or "" for cell in row) for table in tables for row in table)
+
+# The statements have no ruling lines: pdfplumber's default "lines" strategy finds no table in
+# them, so tables are found from text alignment, as in pdf_parser.page_tables
+_TEXT_TABLE_SETTINGS = {
+    "vertical_strategy": "text",
+    "horizontal_strategy": "text",
+    "intersection_y_tolerance": 4,
+    "intersection_x_tolerance": 30,
+}
+
+def _warm_pdfplumber_tables():
+    import pdf_table_extractor
+    pdf_table_extractor.pdfplumber.__name__ # imports pdfplumber
+
+def _pdfplumber_tables(pdf_path):
+    import pdf_table_extractor
+
+    return "\n".join(
+        _format_tables(page.tables)
+        for page in pdf_table_extractor.iter_document_tables(pdf_path, table_settings=_TEXT_TABLE_SETTINGS)
+    )
+
+def _warm_docling():
+    from pdf_parsing import docling_backend
+    docling_backend.warm_up()
+
+def _docling(pdf_path):
+    from pdf_parsing import docling_backend
+    return docling_backend.extract_text(pdf_path)
+
+def _warm_tatr():
+    import table_pipeline
+    from table_detection import get_detector
+    get_detector().load()
+
+def _tatr_tables(pdf_path):
+    import table_pipeline
+
+    pages = table_pipeline.extract_document_tables(pdf_path)
+    return "\n".join(table['content'] for page in pages for table in page['tables'])
+
+BACKENDS = {
+    "pypdf": _pdf_parser_backend("pypdf"),
+    "pypdf2": _pdf_parser_backend("pypdf2"),
+    "pdfplumber": _pdf_parser_backend("pdfplumber"),
+    "custom_settings": _pdf_parser_backend("custom_settings"),
+    "section_markers": _pdf_parser_backend("section_markers"),
+    "layout": _pdf_parser_backend("layout"),
+    "pdfplumber_tables": (_warm_pdfplumber_tables, _pdfplumber_tables),
+    "tatr": (_warm_tatr, _tatr_tables),
+    "docling": (_warm_docling, _docling),
+}
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError: # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def run_backend(backend, pdf_path):
+    """Run one backend over one PDF and measure it. Runs in a fresh worker process."""
+    from pdf_parsing import page_extraction
+
+    warm, run = BACKENDS[backend]
+    warm_start = time.perf_counter()
+    warm()
+    warm_seconds = time.perf_counter() - warm_start
+    pages = page_extraction.count_pages(pdf_path)
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    text = run(pdf_path)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return {
+        "pages": pages,
+        "warm_seconds": warm_seconds,
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "peak_rss_mb": _peak_rss_mb(),
+        "pages_per_second": pages / wall if wall else None,
+        "text": text,
+    }
+
+# --- Ground truth --- #
+_NUMBER_LIKE = re.compile(r"^\(?-?[\d.]+(?:,\d+)?\)?$")
+_NUMBER_IN_TEXT = re.compile(r"\(?-?\d[\d.]*(?:,\d+)?\)?")
+
+def _as_amount(value):
+    """Turn a ground truth cell into an absolute integer amount, or None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        if value != value: # NaN
+            return None
+        if float(value).is_integer():
+            return abs(int(value))
+        # Cells typed as 1.748 were Brazilian thousands read as decimals by Excel
+        return abs(round(value * 1000))
+    if isinstance(value, str) and _NUMBER_LIKE.match(value.strip()):
+        return _text_amount(value.strip())
+    return None
+
+def _text_amount(token):
+    """Turn a Brazilian formatted amount (1.234.567 / (1.234) / 12,5) into an absolute integer."""
+    digits = token.strip("()-").split(",")[0].replace(".", "")
+    return int(digits) if digits else None
+
+def load_ground_truth(xlsx_path):
+    """
+    Read the line items of each sheet of the ground truth workbook
+
+    A line item is a text cell followed, on its right, by an amount (or "-").
+    Returns:
+        Dict mapping each PDF file name to {"labels": set, "values": set}
+    """
+    import pandas as pd
+    from pdf_parsing.page_filter import normalize
+
+    ground_truth = {}
+    for sheet_name, sheet in pd.read_excel(xlsx_path, sheet_name=None, header=None).items():
+        labels, values = set(), set()
+        for row in sheet.itertuples(index=False):
+            for label, value in zip(row, row[1:]):
+                amount = _as_amount(value)
+                is_empty = isinstance(value, str) and value.strip() == "-"
+                # Columns with LLM outputs ("Item: 1, 2", "['...']") are not ground truth
+                if isinstance(label, str) and not re.search(r"[:\[\]]", label) and (amount is not None or is_empty):
+                    labels.add(" ".join(normalize(label).split()))
+                    if amount is not None:
+                        values.add(amount)
+        ground_truth[sheet_name] = {"labels": labels, "values": values}
+    return ground_truth
+
+def score(text, truth):
+    """Share of ground truth line item labels and values found in the extracted text."""
+    from pdf_parsing.page_filter import normalize
+
+    normalized = " ".join(normalize(text).split())
+    amounts = {_text_amount(token) for token in _NUMBER_IN_TEXT.findall(text)}
+    label_recall = sum(label in normalized for label in truth["labels"]) / len(truth["labels"]) if truth["labels"] else None
+    value_recall = len(truth["values"] & amounts) / len(truth["values"]) if truth["values"] else None
+    return {"label_recall": label_recall, "value_recall": value_recall}
+
+# --- Report --- #
+def summarize(results):
+    """Average each metric per backend."""
+    summary = {}
+    for backend in dict.fromkeys(r["backend"] for r in results):
+        runs = [r for r in results if r["backend"] == backend and "error" not in r]
+        metrics = {}
+        for metric in ["warm_seconds", "wall_seconds", "cpu_seconds", "peak_rss_mb", "pages_per_second", "label_recall", "value_recall"]:
+            values = [r[metric] for r in runs if r.get(metric) is not None]
+            metrics[metric] = sum(values) / len(values) if values else None
+        metrics["errors"] = sum(r["backend"] == backend and "error" in r for r in results)
+        summary[backend] = metrics
+    return summary
+
+def find_regressions(summary, baseline, tolerance):
+    """Backends more than `tolerance` slower, or less accurate, than in a previous report."""
+    regressions = []
+    for backend, metrics in summary.items():
+        previous = baseline.get("summary", {}).get(backend)
+        if not previous or metrics["wall_seconds"] is None or previous["wall_seconds"] is None:
+            continue
+        if metrics["wall_seconds"] > previous["wall_seconds"] * (1 + tolerance):
+            regressions.append(f"{backend}: {previous['wall_seconds']:.3f}s -> {metrics['wall_seconds']:.3f}s")
+        for metric in ["label_recall", "value_recall"]:
+            if previous.get(metric) is not None and metrics[metric] is not None and metrics[metric] < previous[metric] - 1e-9:
+                regressions.append(f"{backend}: {metric} {previous[metric]:.3f} -> {metrics[metric]:.3f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="data", help="Folder with the sample PDFs and ground_truth.xlsx")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--output", default="parser_benchmark.json")
+    parser.add_argument("--baseline", help="Previous report to check for regressions against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed wall time increase over the baseline")
+    args = parser.parse_args()
+
+    data = Path(args.data)
+    ground_truth = load_ground_truth(data / "ground_truth.xlsx")
+    pdf_paths = sorted(data.glob("*.pdf"))
+
+    results = []
+    print(f"{'backend':<20}{'document':<32}{'wall s':>8}{'cpu s':>8}{'rss MB':>8}{'pages/s':>9}{'labels':>8}{'values':>8}")
+    for backend in args.backends:
+        for pdf_path in pdf_paths:
+            result = {"backend": backend, "pdf": pdf_path.name}
+            # A fresh process per run keeps peak RSS and imports from leaking between backends
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                try:
+                    result.update(executor.submit(run_backend, backend, str(pdf_path)).result())
+                except Exception as e:
+                    result["error"] = f"{type(e).__name__}: {e}"
+                    print(f"{backend:<20}{pdf_path.name:<32}  failed: {result['error']}")
+                    results.append(result)
+                    continue
+
+            text = result.pop("text")
+            result["characters"] = len(text)
+            if pdf_path.name in ground_truth:
+                result.update(score(text, ground_truth[pdf_path.name]))
+            results.append(result)
+
+            fmt = lambda value: f"{value:>8.2f}" if value is not None else f"{'-':>8}"
+            print(
+                f"{backend:<20}{pdf_path.name:<32}{result['wall_seconds']:>8.2f}{result['cpu_seconds']:>8.2f}"
+                f"{result['peak_rss_mb']:>8.0f}{result['pages_per_second']:>9.1f}"
+                f"{fmt(result.get('label_recall'))}{fmt(result.get('value_recall'))}"
+            )
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+        "summary": summarize(results),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(report["summary"], json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        raise SystemExit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import numpy as np
+
+def to_numpy(values):
+    """
+    Convert a torch tensor, list or array to a numpy array
+
+    Args:
+        values: Tensor (any device), list or numpy array
+    Returns:
+        numpy array
+    """
+    if hasattr(values, "detach"):
+        values = values.detach().cpu().numpy()
+    return np.asarray(values)
+
+def box_areas(boxes):
+    """
+    Areas of XYXY boxes
+
+    Args:
+        boxes: (N, 4) array of x1, y1, x2, y2 boxes
+    Returns:
+        (N,) array of areas
+    """
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+def pairwise_iou(boxes_a, boxes_b):
+    """
+    IoU of every pair of XYXY boxes
+
+    Args:
+        boxes_a: (N, 4) array of boxes
+        boxes_b: (M, 4) array of boxes
+    Returns:
+        (N, M) array of IoUs
+    """
+    boxes_a = to_numpy(boxes_a).astype(np.float64, copy=False).reshape(-1, 4)
+    boxes_b = to_numpy(boxes_b).astype(np.float64, copy=False).reshape(-1, 4)
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    wh = np.clip(bottom_right - top_left, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    union = box_areas(boxes_a)[:, None] + box_areas(boxes_b)[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+def batched_nms(boxes, scores, page_indices=None, score_threshold=0.1, iou_threshold=0.45):
+    """
+    Greedy non-maximum suppression over the boxes of many pages at once
+
+    Works in rounds: each round keeps the best remaining box of every page and, in a
+    single vectorized step over all pages, drops the remaining boxes overlapping the
+    box kept on their page. The number of rounds is the largest number of boxes kept
+    on a page, not the number of pages or candidates, and the result is the same as
+    running greedy NMS page by page.
+
+    Args:
+        boxes: (N, 4) array of XYXY boxes
+        scores: (N,) array of confidences
+        page_indices: (N,) array with the page of each box. Defaults to a single page
+        score_threshold: Boxes scored below this are dropped
+        iou_threshold: Boxes overlapping a higher scored box of the same page above this IoU are dropped
+    Returns:
+        Indices of the kept boxes, grouped by page and sorted by decreasing score
+    """
+    boxes = to_numpy(boxes).astype(np.float64, copy=False).reshape(-1, 4)
+    scores = to_numpy(scores).reshape(-1)
+    page_indices = np.zeros(len(boxes), dtype=np.int64) if page_indices is None else to_numpy(page_indices).reshape(-1)
+
+    candidates = np.flatnonzero(scores >= score_threshold)
+    if candidates.size == 0:
+        return candidates
+
+    # Sort by page, then by decreasing confidence
+    order = candidates[np.lexsort((-scores[candidates], page_indices[candidates]))]
+    _, pages = np.unique(page_indices[order], return_inverse=True)
+    boxes = boxes[order]
+    areas = box_areas(boxes)
+
+    # Remaining boxes are kept compacted, so each round only touches boxes still in play
+    remaining = np.arange(len(order))
+    keep = []
+
+    while remaining.size > 0:
+        # The first remaining box of each page is its best remaining box
+        is_first = np.ones(len(remaining), dtype=bool)
+        is_first[1:] = pages[1:] != pages[:-1]
+        keep.append(remaining[is_first])
+
+        # Pair every other remaining box with the box just kept on its page
+        leader = np.cumsum(is_first) - 1
+        first_boxes, first_areas = boxes[is_first][leader], areas[is_first][leader]
+
+        # IoU against that box
+        top_left = np.maximum(boxes[:, :2], first_boxes[:, :2])
+        bottom_right = np.minimum(boxes[:, 2:], first_boxes[:, 2:])
+        wh = np.clip(bottom_right - top_left, 0, None)
+        inter = wh[:, 0] * wh[:, 1]
+        union = areas + first_areas - inter
+        overlapping = inter > iou_threshold * union
+
+        # Drop the kept boxes and every box overlapping them
+        survivors = ~(is_first | overlapping)
+        remaining, pages, boxes, areas = remaining[survivors], pages[survivors], boxes[survivors], areas[survivors]
+
+    return order[np.sort(np.concatenate(keep))]
+
+def filter_detections(results, score_threshold=0.1, iou_threshold=0.45):
+    """
+    Run batched NMS over the detections of all pages of a document
+
+    Args:
+        results: List with one post-processed detections dict ("boxes", "scores" and
+            optionally "labels") per page
+        score_threshold: Minimum detection confidence
+        iou_threshold: IoU above which overlapping detections are suppressed
+    Returns:
+        List with the filtered detections of each page, in input order
+    """
+    if not results:
+        return []
+
+    counts = [len(r["scores"]) for r in results]
+    boxes = np.concatenate([to_numpy(r["boxes"]).reshape(-1, 4) for r in results])
+    scores = np.concatenate([to_numpy(r["scores"]).reshape(-1) for r in results])
+    page_indices = np.repeat(np.arange(len(results)), counts)
+
+    keep = batched_nms(boxes, scores, page_indices, score_threshold, iou_threshold)
+
+    # Split the kept indices back into per-page positions
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    filtered = []
+    for page, r in enumerate(results):
+        page_keep = keep[page_indices[keep] == page] - starts[page]
+        filtered.append({key: value[page_keep] for key, value in r.items()})
+    return filtered
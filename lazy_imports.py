@@ -0,0 +1,26 @@
+import importlib
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access
+
+    `fitz = LazyModule("fitz")` at the top of a module keeps `fitz.open(...)` working while
+    only code paths that actually use fitz pay for importing it. Importing a backend that is
+    not installed fails at first use instead of at import time.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
@@ -1,99 +1,96 @@
 # --- Custom modules for the project --- #
-from agents import generic_openai_agent as llm # Declares the OpenAI models that the agents will use
-from structured_output import output_classes as output # Declares the output classes that the agents will return
-from pdf_parsing import pdf_parser # Declares the pdf parsing functions to extract raw text from pdf files
+from agents.extraction_agents import ( # Declares the agent that extracts the fields
+    field_extraction_agent,
+    field_extraction_prompt,
+)
+from pdf_parsing import cache as extraction_cache # Serves the page texts of PDFs parsed by previous runs
+from pdf_parsing import page_filter # Keeps only the balance sheet and income statement pages
+from agents import section_agents # Per-section agents run concurrently (fan-out mode)
+from agents import chunked_extraction # Chunks of long documents extracted concurrently and merged (map-reduce mode)
+from structured_output.dataframe_builder import build_dataframe # Builds the pd.DataFrame from the extracted fields
+from tracing.stage_tracing import enable_file_sink, stage, start_run # Times each stage of the pipeline (refer to tracing/summary.py for p50/p95)
 
 # --- Python modules --- #
 import logfire # for debugging, logging and tracing results
-import toml # for prompts
-from pydantic_ai import Agent, RunContext # AI models and agents
-
-# --- Load the prompts --- #
-prompts = toml.load("prompts/prompts.toml")
 
 # --- Configure logfire --- #
 logfire.configure()
 
-# --- Build agents --- #
-# Agent to extract the fields from the pdf file. The result (result_type) is a DocumentStructure object, which is a structured representation of the fields we want to extract.
-# The system_prompt refers to the prompt that the agent will use to generate the fields.
-# This agent will later receive a dynamic system prompt, which will contain the extracted raw text from the pdf file (refer to @field_extraction_agent.system_prompt)
-field_extraction_agent = Agent(
-    model=llm.gpt_4o,
-    result_type=output.DocumentStructure,
-    model_settings={
-        "temperature": 0
-    },
-    system_prompt=prompts["system_prompts"]["extraction_agent_system_prompt"]
-)
-
-# Agent to write the code that builds a pd.DataFrame from the extracted fields.
-# The result (result_type) is a string, which is the Python code that builds the DataFrame.
-# The system prompt refers to the prompt that the agent will use to generate the code. #TODO: Put this prompt in prompts.toml
-# This agent will later receive a dynamic system prompt, which will contain the extracted fields (refer to @df_building_agent.system_prompt).
-df_building_agent = Agent(
-    model=llm.gpt_4o,
-    result_type=str,
-    model_settings={
-        "temperature": 0
-    },
-    system_prompt=(
-        """
-        Elabore um código em Python que construa um pd.DataFrame a partir dos dados fornecidos.
-        Escreva somente a importação das bibliotecas, a declaração de variáveis, a função de construção
-        do DataFrame e a chamada da função. Caso inclua explicações, faça-o em comentários.
-        """
-    )
-
-)
-
 # --- Load the pdf file using pypdf --- #
 pdf_path = "data/atradius.pdf"
-text = pdf_parser.extract_text_from_pdf_pypdf(pdf_path)
-
-# --- Dynamic System Prompts --- #
-# Passes a dynamic prompt to the agent, containing the extracted text from the pdf file.
-@field_extraction_agent.system_prompt
-def get_raw_text_from_pdf(ctx: RunContext[str]) -> str:
-    return f"<raw-data>{ctx.deps}</raw-data>"
+# Fan-out mode: one small agent per section, run concurrently on that section's pages, instead of a single long extraction.
+# Set section_model to section_agents.llm.gpt_4o_mini to run the section agents on the smaller model.
+section_fan_out = False
+section_model = None
+# Map-reduce mode: for documents whose text exceeds the context window (or takes too long in a single request),
+# the selected pages are split into token-budgeted chunks, extracted concurrently and merged.
+chunked = False
+# Re-running on the same PDF reuses its page texts from .cache/extraction. False (or EXTRACTION_CACHE=off) re-parses it.
+use_cache = None
+enable_file_sink() # Records the stages to .cache/traces/stages.jsonl (or STAGE_TRACE_FILE)
+start_run(document=pdf_path)
+page_texts = extraction_cache.extract_pages(pdf_path, parser="pypdf", workers=1, use_cache=use_cache)
 
-# Passes a dynamic system prompt to the agent, containing the extracted fields from the pdf file.
-@df_building_agent.system_prompt
-def get_results_from_field_extraction(ctx: RunContext[output.DocumentStructure]) -> str:
-    return f"<field-extraction>{ctx.deps}</field-extraction>"
+# --- Keep only the relevant pages --- #
+# Auditor reports and explanatory notes are never used by the extraction, so they are dropped from the prompt.
+with stage("page_filter", pages=len(page_texts)):
+    text = page_filter.filter_text(page_texts)
 
 # --- Run the agents --- #
-field_extraction = field_extraction_agent.run_sync(
-    """
-    Analise o texto fornecido e extraia
-    os dados conforme a instrução passada.
-    """,
-    deps=text
-    )
+if section_fan_out:
+    with stage("llm_extraction", mode="sections") as llm_stage:
+        document_structure, section_runs = section_agents.extract_sections_sync(page_texts, model=section_model)
+        llm_stage.set(
+            prompt_tokens=sum(run.usage().request_tokens for run in section_runs.values()),
+            completion_tokens=sum(run.usage().response_tokens for run in section_runs.values()),
+        )
+elif chunked:
+    with stage("llm_extraction", mode="chunks") as llm_stage:
+        document_structure, chunk_runs = chunked_extraction.extract_chunked_sync(
+            page_texts,
+            pages=page_filter.select_pages(page_texts)
+            )
+        llm_stage.set(
+            chunks=len(chunk_runs),
+            prompt_tokens=sum(run.usage().request_tokens for run in chunk_runs),
+            completion_tokens=sum(run.usage().response_tokens for run in chunk_runs),
+        )
+else:
+    with stage("llm_extraction", model=field_extraction_agent.model.model_name) as llm_stage:
+        field_extraction = field_extraction_agent.run_sync(
+            field_extraction_prompt,
+            deps=text
+            )
+        llm_stage.set(
+            prompt_tokens=field_extraction.usage().request_tokens,
+            completion_tokens=field_extraction.usage().response_tokens,
+        )
+    document_structure = field_extraction.data
 
-df_building_code = df_building_agent.run_sync(
-    "Execute a tarefa de construção do DataFrame.",
-    deps=field_extraction.data
-    )
+# --- Build the DataFrame --- #
+# Parses the "[NOME DO CAMPO]: [VALOR_1], [VALOR_2]" entries locally, with no second LLM call.
+with stage("dataframe_building") as building_stage:
+    df = build_dataframe(document_structure)
+    building_stage.set(rows=len(df), unparsed=len(df.attrs["nao_convertidos"]))
 
 # --- Logging the results --- #
 # Logs the field extraction result
 logfire.notice(
     "Field extraction result: {field_extraction}",
-    field_extraction=dict(field_extraction.data)
+    field_extraction=dict(document_structure)
     )
 # Logs the type of the field extraction result
 logfire.info(
     "Result type: {field_extraction}",
-    field_extraction=type(field_extraction.data)
+    field_extraction=type(document_structure)
     )
-# Logs the code generation result - a Python code that builds a pd.DataFrame from the extracted data
+# Logs the DataFrame built from the extracted fields
 logfire.notice(
-    "Code generation result: {df_building_code}",
-    df_building_code=str(df_building_code.data)
+    "DataFrame: {df}",
+    df=df.to_string()
 )
-# Logs the type of the code generation result - should be a string #TODO: check if there's a better data type to store code.
+# Logs the entries whose values could not be converted to numbers, to be checked by hand
 logfire.info(
-    "Code generation result type: {df_building_code}",
-    df_building_code=type(df_building_code.data)
+    "Unparsed entries: {unparsed}",
+    unparsed=df.attrs["nao_convertidos"]
 )
\ No newline at end of file
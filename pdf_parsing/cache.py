@@ -0,0 +1,230 @@
+# --- Imports --- #
+import os
+import json
+import hashlib
+import tempfile
+import functools
+from dataclasses import dataclass, asdict
+from importlib import metadata
+from pathlib import Path
+
+from pdf_parsing import page_extraction
+from pdf_parsing import pdf_parser
+from pdf_parsing.pdf_parser import pdfplumber
+
+# --- Config --- #
+DEFAULT_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", ".cache/extraction")
+DEFAULT_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# EXTRACTION_CACHE=off makes extract_pages re-parse every document
+CACHE_ENABLED = os.getenv("EXTRACTION_CACHE", "on").lower() not in ("off", "0", "false")
+
+# Distribution whose version is part of the cache key of each parser. A library
+# upgrade may change the extracted text, so it must not be served from old entries.
+PARSER_LIBRARIES = {
+    "pypdf": "pypdf",
+    "pypdf2": "PyPDF2",
+    "pdfplumber": "pdfplumber",
+    "custom_settings": "pdfplumber",
+    "section_markers": "pdfplumber",
+    "layout": "pdfplumber",
+    "tables": "pdfplumber",
+    "hybrid_ocr": "pytesseract",
+}
+
+def library_version(parser):
+    """Returns the installed version of the library behind `parser`."""
+    try:
+        return metadata.version(PARSER_LIBRARIES.get(parser, parser))
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+# Modules of this package whose code shapes each parser's output, besides pdf_parser.py. Their
+# source is part of the cache key, so that changing a constant (layout thresholds, OCR
+# resolution planning) does not serve entries built with the old one.
+PARSER_SOURCES = {
+    "layout": ["layout.py"],
+    "hybrid_ocr": ["render_planner.py"],
+}
+
+@functools.lru_cache(maxsize=None)
+def code_version(parser):
+    """Returns a hash of the source of the modules producing `parser`'s output."""
+    digest = hashlib.sha256()
+    for name in ["pdf_parser.py", *PARSER_SOURCES.get(parser, [])]:
+        digest.update((Path(__file__).parent / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+def file_hash(pdf_path):
+    """Returns the SHA-256 hex digest of a file's content."""
+    with open(pdf_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+# --- Cache --- #
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+class ExtractionCache:
+    """
+    On-disk, content-addressed cache of extraction results
+
+    Entries are JSON files named after the hash of (file content, parser, settings,
+    library version, code version). Reading an entry refreshes its mtime, and writes evict the
+    least recently used entries until the cache fits in `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+
+    def key(self, pdf_path, parser, settings=None):
+        """Builds the cache key of a parser run over a file."""
+        payload = json.dumps(
+            {
+                "file": file_hash(pdf_path),
+                "parser": parser,
+                "settings": settings or {},
+                "version": library_version(parser),
+                "code": code_version(parser),
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key):
+        """Returns the cached entry for `key`, or None."""
+        path = self._path(key)
+        try:
+            with path.open(encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.stats.misses += 1
+            return None
+
+        os.utime(path) # mark as recently used
+        self.stats.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        """Stores `entry` under `key` and evicts old entries if the cache is full."""
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+        self.stats.writes += 1
+        self.evict()
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        entries = [(path.stat(), path) for path in self.cache_dir.glob("*.json")]
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, path in sorted(entries, key=lambda item: item[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            self.stats.evictions += 1
+
+    def size(self):
+        """Returns the total size of the cached entries, in bytes."""
+        return sum(path.stat().st_size for path in self.cache_dir.glob("*.json"))
+
+    def clear(self):
+        """Deletes every cached entry."""
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    def get_or_compute(self, pdf_path, parser, settings, compute):
+        """Returns the cached entry of a parser run, calling `compute()` to build it on a miss."""
+        key = self.key(pdf_path, parser, settings)
+        entry = self.get(key)
+        if entry is None:
+            entry = compute()
+            self.put(key, entry)
+        return entry
+
+_default_cache = None
+
+def get_default_cache():
+    """Returns the process-wide cache, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ExtractionCache()
+    return _default_cache
+
+# --- Cached extractors --- #
+def cached_pages(pdf_path, parser="pypdf", pages=None, workers=1, cache=None):
+    """Same as page_extraction.extract_pages, served from the cache when possible."""
+    cache = cache or get_default_cache()
+    settings = {"pages": list(pages) if pages is not None else None}
+
+    def compute():
+        records = page_extraction.iter_pages(pdf_path, parser=parser, pages=pages, workers=workers)
+        return {"pages": [{"page_number": r.page_number, "text": r.text} for r in records]}
+
+    entry = cache.get_or_compute(pdf_path, parser, settings, compute)
+    return [page["text"] for page in entry["pages"]]
+
+def extract_pages(pdf_path, parser="pypdf", pages=None, workers=None, use_cache=None):
+    """
+    Same as page_extraction.extract_pages, served from the cache unless it is disabled
+
+    Re-running on the same PDFs skips parsing entirely.
+    Args:
+        use_cache: False always re-parses. Defaults to CACHE_ENABLED (EXTRACTION_CACHE=off disables it)
+    """
+    if use_cache is None:
+        use_cache = CACHE_ENABLED
+    if not use_cache:
+        return page_extraction.extract_pages(pdf_path, parser=parser, pages=pages, workers=workers)
+    return cached_pages(pdf_path, parser, pages, workers)
+
+def cached_text(pdf_path, parser="pypdf", pages=None, workers=1, cache=None):
+    """Same as page_extraction.extract_text, served from the cache when possible."""
+    return page_extraction.join_pages(cached_pages(pdf_path, parser, pages, workers, cache))
+
+def cached_pages_hybrid(pdf_path, min_chars=pdf_parser.MIN_TEXT_CHARS, dpi=300, workers=None, cache=None):
+    """Same as pdf_parser.extract_pages_hybrid, served from the cache when possible."""
+    cache = cache or get_default_cache()
+    settings = {"min_chars": min_chars, "dpi": dpi or "planned"}
+
+    def compute():
+        page_texts = pdf_parser.extract_pages_hybrid(pdf_path, min_chars, dpi, workers)
+        return {"pages": [{"page_number": n, "text": text} for n, text in enumerate(page_texts)]}
+
+    entry = cache.get_or_compute(pdf_path, "hybrid_ocr", settings, compute)
+    return [page["text"] for page in entry["pages"]]
+
+def cached_page_tables(pdf_path, cache=None):
+    """Returns the tables of each page (see pdf_parser.page_tables), served from the cache when possible."""
+    cache = cache or get_default_cache()
+
+    def compute():
+        with pdfplumber.open(pdf_path) as reader:
+            return {
+                "pages": [
+                    {"page_number": page_number, "tables": pdf_parser.page_tables(page)}
+                    for page_number, page in enumerate(reader.pages)
+                ]
+            }
+
+    entry = cache.get_or_compute(pdf_path, "tables", {}, compute)
+    return [page["tables"] for page in entry["pages"]]
+
+def cached_tables(pdf_path, cache=None):
+    """Same as pdf_parser.extract_tables, served from the cache when possible."""
+    return [table for tables in cached_page_tables(pdf_path, cache) for table in tables]
+
+def cache_stats(cache=None):
+    """Returns the hit/miss counters of a cache as a dict."""
+    return asdict((cache or get_default_cache()).stats)
@@ -0,0 +1,106 @@
+# --- Imports --- #
+import re
+from dataclasses import dataclass
+
+from pdf_parsing.page_filter import estimate_tokens, normalize
+
+# --- Config --- #
+# Tokens of document text per chunk. Leaves room in gpt-4o's 128k context for the system
+# prompt, the DocumentStructure schema and a long completion, and keeps each request short.
+MAX_CHUNK_TOKENS = 12000
+# tiktoken encoding of the gpt-4o family
+ENCODING = "o200k_base"
+
+# Lines starting a statement or a section, where an oversized page is preferably split
+_SECTION_HEADING = re.compile(
+    r"^\s*(?:balanco patrimonial|ativo (?:nao )?circulante|passivo (?:nao )?circulante|patrimonio liquido"
+    r"|demonstrac(?:ao|oes) d[oe]s? resultados?|passivo e patrimonio liquido|ativo\s*$|passivo\s*$)"
+)
+
+# --- Token counting --- #
+_encoder = None
+
+def count_tokens(text):
+    """Tokens of `text` for the gpt-4o tokenizer, counted locally. Estimated when tiktoken is not installed."""
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding(ENCODING)
+        except ImportError:
+            _encoder = False
+    if not _encoder:
+        return estimate_tokens(text)
+    return len(_encoder.encode(text, disallowed_special=()))
+
+# --- Chunks --- #
+@dataclass
+class Chunk:
+    """Consecutive pages (or parts of one page) sent in a single extraction request."""
+    pages: list # page numbers (0-based) the text comes from
+    text: str
+    tokens: int
+
+def split_page(text, max_tokens=MAX_CHUNK_TOKENS):
+    """
+    Split the text of one page into parts of at most `max_tokens`
+
+    Parts end right before a section heading (ATIVO CIRCULANTE, PASSIVO, DEMONSTRACAO DO
+    RESULTADO...) when one is found in the part, otherwise on a line boundary, so that a line
+    item never has its label and amounts in different parts.
+    Returns:
+        List of strings, joined back to `text` when concatenated
+    """
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    lines = text.splitlines(keepends=True)
+    parts, current, current_tokens, last_heading = [], [], 0, None
+    for line in lines:
+        line_tokens = count_tokens(line)
+        if current and current_tokens + line_tokens > max_tokens:
+            cut = last_heading if last_heading else len(current)
+            parts.append("".join(current[:cut]))
+            current = current[cut:]
+            current_tokens = sum(count_tokens(kept) for kept in current)
+            last_heading = None
+        if current and _SECTION_HEADING.match(normalize(line)):
+            last_heading = len(current)
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        parts.append("".join(current))
+    return parts
+
+def chunk_pages(page_texts, max_tokens=MAX_CHUNK_TOKENS, pages=None):
+    """
+    Pack consecutive pages into chunks of at most `max_tokens`
+
+    Chunks only break between pages, except for a page over the budget by itself, which is
+    split on its section headings (refer to split_page).
+    Args:
+        page_texts: Text of each page, in page order
+        max_tokens: Token budget of each chunk's text
+        pages: Optional page numbers (0-based) to keep, e.g. from page_filter.select_pages
+    Returns:
+        List of Chunk, in page order
+    """
+    pages = range(len(page_texts)) if pages is None else sorted(pages)
+    chunks, current_pages, current_text, current_tokens = [], [], [], 0
+
+    def close():
+        if current_text:
+            chunks.append(Chunk(list(current_pages), "".join(current_text), current_tokens))
+
+    for page_number in pages:
+        for part in split_page(page_texts[page_number], max_tokens):
+            part_tokens = count_tokens(part)
+            if current_text and current_tokens + part_tokens > max_tokens:
+                close()
+                current_pages, current_text, current_tokens = [], [], 0
+            if page_number not in current_pages:
+                current_pages.append(page_number)
+            current_text.append(part)
+            current_tokens += part_tokens
+    close()
+    return chunks
@@ -0,0 +1,193 @@
+# --- Imports --- #
+import os
+import time
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+
+from pdf_parsing import page_extraction
+from pdf_parsing.page_filter import numeric_density
+from tracing.stage_tracing import stage
+
+# --- Config --- #
+FAST = "fast"
+ACCURATE = "accurate"
+# Pages whose share of amounts among their tokens reaches this use TableFormer ACCURATE mode.
+# Statement pages of the sample PDFs score 0.09-0.34, notes and cover pages 0.00-0.04.
+ACCURATE_MIN_DENSITY = 0.08
+# Maximum pages converted in one docling call. Smaller chunks spread better across workers,
+# larger ones pay the per-call document loading less often.
+CHUNK_PAGES = 8
+
+# --- Pages --- #
+@dataclass
+class DoclingPage:
+    """Markdown and tables of a single page, as yielded by iter_document."""
+    page_number: int # 0-based
+    mode: str # TableFormer mode the page was converted with
+    text: str # markdown export of the page
+    tables: list = field(default_factory=list) # one pandas DataFrame per table
+    elapsed: float = 0.0 # seconds spent converting the page's chunk, split evenly over its pages
+
+# --- Converter pool --- #
+# One warm DocumentConverter per (mode, cell matching) per process: building it loads the
+# layout and TableFormer models, which costs far more than converting a few pages.
+_converters = {}
+_converters_lock = threading.Lock()
+
+def _build_converter(mode, do_cell_matching):
+    from docling.datamodel.base_models import InputFormat
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+    from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode
+
+    pipeline_options = PdfPipelineOptions(do_table_structure=True)
+    pipeline_options.table_structure_options.do_cell_matching = do_cell_matching
+    pipeline_options.table_structure_options.mode = TableFormerMode.ACCURATE if mode == ACCURATE else TableFormerMode.FAST
+
+    converter = DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(
+                pipeline_options=pipeline_options
+            )
+        }
+    )
+    with stage("model_load", model="docling", mode=mode):
+        converter.initialize_pipeline(InputFormat.PDF)
+    return converter
+
+def get_converter(mode=ACCURATE, do_cell_matching=False):
+    """Return the process-wide DocumentConverter of a TableFormer mode, creating it on first use."""
+    key = (mode, do_cell_matching)
+    with _converters_lock:
+        if key not in _converters:
+            _converters[key] = _build_converter(mode, do_cell_matching)
+        return _converters[key]
+
+def warm_up(modes=(FAST, ACCURATE), do_cell_matching=False):
+    """Build the converters of `modes` ahead of the first document."""
+    for mode in modes:
+        get_converter(mode, do_cell_matching)
+
+# --- Page planning --- #
+def plan_modes(pdf_path, pages, min_density=ACCURATE_MIN_DENSITY):
+    """
+    Picks the TableFormer mode of each page from a cheap pypdf text pass
+
+    Pages dense in amounts (financial statements) get ACCURATE, the others FAST. Pages
+    without a text layer (scans) get ACCURATE, as their content is unknown until OCR.
+    Returns:
+        Dict mapping each page number (0-based) to FAST or ACCURATE
+    """
+    texts = page_extraction.extract_pages(pdf_path, parser="pypdf", pages=pages, workers=1)
+    return {
+        page_number: ACCURATE if not text.strip() or numeric_density(text) >= min_density else FAST
+        for page_number, text in zip(pages, texts)
+    }
+
+def plan_chunks(modes, chunk_pages=CHUNK_PAGES):
+    """
+    Groups pages into page ranges converted by a single docling call
+
+    A chunk holds consecutive pages of the same mode, at most `chunk_pages` of them.
+    Returns:
+        List of (mode, first page, last page) tuples, 0-based and inclusive, in page order
+    """
+    chunks = []
+    for page_number in sorted(modes):
+        mode = modes[page_number]
+        if chunks:
+            last_mode, first, last = chunks[-1]
+            if last_mode == mode and last == page_number - 1 and page_number - first < chunk_pages:
+                chunks[-1] = (mode, first, page_number)
+                continue
+        chunks.append((mode, page_number, page_number))
+    return chunks
+
+# --- Conversion --- #
+def convert_chunk(pdf_path, mode, first, last, do_cell_matching=False):
+    """
+    Converts a page range with the warm converter of `mode`
+
+    Returns:
+        List of DoclingPage, one per page of the range
+    """
+    start = time.perf_counter()
+    result = get_converter(mode, do_cell_matching).convert(pdf_path, page_range=(first + 1, last + 1))
+    document = result.document
+
+    pages = {
+        page_number: DoclingPage(page_number, mode, document.export_to_markdown(page_no=page_number + 1))
+        for page_number in range(first, last + 1)
+    }
+    for table in document.tables:
+        # docling numbers pages from 1, in the original document
+        page_number = table.prov[0].page_no - 1 if table.prov else first
+        if page_number in pages:
+            pages[page_number].tables.append(table.export_to_dataframe())
+
+    elapsed = (time.perf_counter() - start) / len(pages)
+    for page in pages.values():
+        page.elapsed = elapsed
+    return list(pages.values())
+
+def _warm_worker(modes, do_cell_matching):
+    """Worker process initializer: load the converters once, before the first chunk."""
+    warm_up(modes, do_cell_matching)
+
+def iter_document(pdf_path, pages=None, workers=1, mode=None, chunk_pages=CHUNK_PAGES, do_cell_matching=False):
+    """
+    Yields a DoclingPage per page as soon as its chunk is converted, in page order
+
+    Args:
+        pdf_path: Path to the PDF file
+        pages: Optional list of page numbers (0-based) to convert, e.g. from
+            page_filter.select_pages. Defaults to all pages
+        workers: Number of worker processes, each holding its own warm converters.
+            None uses os.cpu_count(); 1 converts in this process
+        mode: FAST or ACCURATE for every page. None picks it per page (refer to plan_modes)
+        chunk_pages: Maximum pages per docling call
+        do_cell_matching: Match TableFormer cells to the PDF text cells
+    Returns:
+        Generator of DoclingPage objects
+    """
+    if pages is None:
+        pages = range(page_extraction.count_pages(pdf_path))
+    pages = sorted(pages)
+    modes = plan_modes(pdf_path, pages) if mode is None else dict.fromkeys(pages, mode)
+    chunks = plan_chunks(modes, chunk_pages)
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+
+    with stage("docling", workers=workers, chunks=len(chunks)) as docling_stage:
+        docling_stage.set(
+            pages=0, tables=0,
+            accurate_pages=sum(page_mode == ACCURATE for page_mode in modes.values()),
+        )
+        for page in _iter_chunks(pdf_path, chunks, workers, do_cell_matching):
+            docling_stage.set(pages=docling_stage.attributes["pages"] + 1,
+                              tables=docling_stage.attributes["tables"] + len(page.tables))
+            yield page
+
+def _iter_chunks(pdf_path, chunks, workers, do_cell_matching):
+    if workers <= 1:
+        for chunk_mode, first, last in chunks:
+            yield from convert_chunk(pdf_path, chunk_mode, first, last, do_cell_matching)
+        return
+
+    used_modes = tuple(dict.fromkeys(chunk_mode for chunk_mode, _, _ in chunks))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker,
+                             initargs=(used_modes, do_cell_matching)) as executor:
+        # executor.map yields chunk results in submission order, which keeps pages in order
+        n = len(chunks)
+        results = executor.map(
+            convert_chunk, [pdf_path] * n, *zip(*chunks), [do_cell_matching] * n
+        )
+        for chunk_records in results:
+            yield from chunk_records
+
+def convert_document(pdf_path, pages=None, workers=1, mode=None, chunk_pages=CHUNK_PAGES, do_cell_matching=False):
+    """Same as iter_document, collected into a list."""
+    return list(iter_document(pdf_path, pages, workers, mode, chunk_pages, do_cell_matching))
+
+def extract_text(pdf_path, pages=None, workers=1, mode=None):
+    """Markdown of the requested pages, joined in page order."""
+    return "\n\n".join(page.text for page in iter_document(pdf_path, pages=pages, workers=workers, mode=mode))
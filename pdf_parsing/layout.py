@@ -0,0 +1,184 @@
+# --- Imports --- #
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# --- Config --- #
+# Amounts, dates and years as printed in the statements: 1.234, (1.234), -1.234,56, 31/12/2022, 2021, "-"
+_NUMERIC = re.compile(r"^\(?[-–]?\d[\d.,/]*\)?$|^[-–—]$")
+
+# Row and cell tolerances, as multiples of the median word height of the page
+ROW_TOLERANCE = 0.5 # word centers closer than this are on the same row
+CELL_GAP = 0.6 # words further apart than this start a new cell
+ANCHOR_GAP = 0.5 # right edges of amounts further apart than this belong to different columns
+BLOCK_GAP = 1.5 # x positions of text following amounts closer than this mark the same block start
+# A period column must hold the amounts of at least this many rows, and this share of the rows
+# with amounts. Stray numbers (note references, dates in titles) stay in the label.
+MIN_COLUMN_ROWS = 2
+MIN_COLUMN_SHARE = 0.2
+# Text starting after amounts at the same x on this many rows, and on at least this share of the
+# rows holding amounts, marks a new side-by-side block (e.g. liabilities printed right of assets)
+MIN_BLOCK_ROWS = 3
+MIN_BLOCK_SHARE = 0.2
+# Separator between the label and the values of a row in the LLM representation
+SEPARATOR = "|"
+
+# --- Layout --- #
+@dataclass
+class LayoutRow:
+    label: str
+    values: list # one entry per period column of the block, "" when empty
+
+@dataclass
+class LayoutBlock:
+    columns: list # x position of the right edge of each period column
+    rows: list = field(default_factory=list)
+
+@dataclass
+class PageLayout:
+    blocks: list
+
+    def to_text(self, separator=SEPARATOR):
+        """Compact representation: one 'label|value|value' line per row, blocks separated by a blank line."""
+        return "\n\n".join(
+            "\n".join(
+                separator.join([row.label, *row.values]).rstrip(separator) if any(row.values) else row.label
+                for row in block.rows
+            )
+            for block in self.blocks if block.rows
+        ) + "\n"
+
+# --- Word arrays --- #
+def page_words(page):
+    """Words of a pdfplumber page as arrays: (texts, x0, x1, top, bottom)."""
+    words = page.extract_words(x_tolerance=3, y_tolerance=3, keep_blank_chars=False)
+    texts = np.array([word["text"] for word in words], dtype=object)
+    boxes = np.array([[word["x0"], word["x1"], word["top"], word["bottom"]] for word in words], dtype=float).reshape(-1, 4)
+    return texts, boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+
+def cluster_1d(values, gap):
+    """
+    Cluster ids of 1-D values: sorted values more than `gap` apart start a new cluster
+
+    Returns:
+        Array of cluster ids in the input order, numbered by increasing value
+    """
+    if not len(values):
+        return np.zeros(0, dtype=int)
+    order = np.argsort(values, kind="stable")
+    ids = np.empty(len(values), dtype=int)
+    ids[order] = np.concatenate([[0], np.cumsum(np.diff(values[order]) > gap)])
+    return ids
+
+def _cells(texts, x0, x1, rows, numeric, gap):
+    """
+    Group the words of each row into cells
+
+    Consecutive words closer than `gap` form one cell, except amounts, which are always a cell
+    of their own so that "19.409 6.126" printed with a single space still gives two columns.
+    Returns:
+        Tuple (cell row, cell x0, cell x1, cell text, cell is numeric), cells sorted by row then x
+    """
+    order = np.lexsort((x0, rows))
+    texts, x0, x1, rows, numeric = texts[order], x0[order], x1[order], rows[order], numeric[order].copy()
+
+    # A dash between two nearby words is a hyphen ("Contas a receber - partes relacionadas"), not a nil amount
+    near_previous = np.zeros(len(order), dtype=bool)
+    near_previous[1:] = (rows[1:] == rows[:-1]) & (x0[1:] - x1[:-1] <= gap)
+    near_next = np.append(near_previous[1:], False)
+    numeric &= ~(np.isin(texts, ["-", "–", "—"]) & near_previous & near_next)
+
+    new_cell = np.ones(len(order), dtype=bool)
+    new_cell[1:] = (rows[1:] != rows[:-1]) | (x0[1:] - x1[:-1] > gap) | numeric[1:] | numeric[:-1]
+    starts = np.flatnonzero(new_cell)
+    ends = np.append(starts[1:], len(order))
+
+    cell_text = np.array([" ".join(texts[start:end]) for start, end in zip(starts, ends)], dtype=object)
+    return rows[starts], x0[starts], np.maximum.reduceat(x1, starts), cell_text, numeric[starts]
+
+def _block_splits(rows, x0, numeric, gap):
+    """x positions where text cells start to the right of amounts on enough rows."""
+    if not len(rows):
+        return np.zeros(0)
+    # Amounts seen so far on each row, counting the cells left to right
+    row_start = np.ones(len(rows), dtype=bool)
+    row_start[1:] = rows[1:] != rows[:-1]
+    seen = np.cumsum(numeric)
+    seen_before_row = np.maximum.accumulate(np.where(row_start, seen - numeric, 0))
+    after_amount = ~numeric & (seen - seen_before_row > 0)
+
+    candidates = np.sort(x0[after_amount])
+    if not len(candidates):
+        return np.zeros(0)
+    clusters = cluster_1d(candidates, gap)
+    counts = np.bincount(clusters)
+    min_rows = max(MIN_BLOCK_ROWS, MIN_BLOCK_SHARE * len(np.unique(rows[numeric])))
+    return np.array([candidates[clusters == c].min() for c in np.flatnonzero(counts >= min_rows)])
+
+def _block(texts, x0, x1, top, bottom, numeric, height):
+    rows = cluster_1d((top + bottom) / 2, ROW_TOLERANCE * height)
+    cell_rows, cell_x0, cell_x1, cell_text, cell_numeric = _cells(texts, x0, x1, rows, numeric, CELL_GAP * height)
+
+    # Period columns: amounts are right aligned, so their right edges pile up at the column position.
+    # The closing parenthesis of negatives hangs past the digits and is left out of the edge.
+    amount_text = cell_text[cell_numeric]
+    lengths = np.fromiter(map(len, amount_text), dtype=float, count=len(amount_text))
+    closing = np.fromiter((text.endswith(")") for text in amount_text), dtype=bool, count=len(amount_text))
+    char_width = (cell_x1[cell_numeric] - cell_x0[cell_numeric]) / np.maximum(lengths, 1)
+    amount_x1 = cell_x1[cell_numeric] - closing * char_width
+    anchor_ids = cluster_1d(amount_x1, ANCHOR_GAP * height)
+    counts = np.bincount(anchor_ids) if len(anchor_ids) else np.zeros(0, dtype=int)
+    min_rows = max(MIN_COLUMN_ROWS, MIN_COLUMN_SHARE * len(np.unique(cell_rows[cell_numeric])))
+    kept = np.flatnonzero(counts >= min_rows)
+    anchors = np.array([np.median(amount_x1[anchor_ids == a]) for a in kept])
+
+    # Column of each cell, -1 for label cells (text and amounts outside any period column)
+    columns = np.full(len(cell_rows), -1)
+    if len(anchors):
+        nearest = np.abs(amount_x1[:, None] - anchors[None, :]).argmin(axis=1)
+        in_column = np.abs(amount_x1 - anchors[nearest]) <= ANCHOR_GAP * height
+        columns[np.flatnonzero(cell_numeric)[in_column]] = nearest[in_column]
+
+    block = LayoutBlock(columns=anchors.round(1).tolist())
+    for row in np.unique(cell_rows):
+        in_row = cell_rows == row
+        label = " ".join(cell_text[in_row & (columns < 0)])
+        values = [""] * len(anchors)
+        for column, text in zip(columns[in_row & (columns >= 0)], cell_text[in_row & (columns >= 0)]):
+            values[column] = f"{values[column]} {text}".strip()
+        block.rows.append(LayoutRow(label, values))
+    return block
+
+def page_layout(page):
+    """
+    Rebuild the rows, side-by-side blocks and period columns of a pdfplumber page
+
+    Words are clustered into rows by their vertical center and into cells by horizontal gaps.
+    Blocks printed side by side (assets | liabilities, balance sheet | DRE) are split where text
+    starts right after amounts on several rows, and the amounts of each block are aligned to
+    period columns by their right edges.
+    Returns:
+        PageLayout
+    """
+    texts, x0, x1, top, bottom = page_words(page)
+    if not len(texts):
+        return PageLayout(blocks=[])
+    numeric = np.array([bool(_NUMERIC.match(text)) for text in texts], dtype=bool)
+    height = float(np.median(bottom - top)) or 1.0
+
+    rows = cluster_1d((top + bottom) / 2, ROW_TOLERANCE * height)
+    cell_rows, cell_x0, _, _, cell_numeric = _cells(texts, x0, x1, rows, numeric, CELL_GAP * height)
+    splits = _block_splits(cell_rows, cell_x0, cell_numeric, BLOCK_GAP * height)
+
+    block_ids = np.searchsorted(splits, x0 + 0.01, side="right") if len(splits) else np.zeros(len(texts), dtype=int)
+    blocks = []
+    for block_id in np.unique(block_ids):
+        in_block = block_ids == block_id
+        blocks.append(_block(texts[in_block], x0[in_block], x1[in_block], top[in_block], bottom[in_block],
+                             numeric[in_block], height))
+    return PageLayout(blocks=blocks)
+
+def layout_page_text(page):
+    """Extracts the text of a single pdfplumber page as rows of 'label|value|value' per block."""
+    return page_layout(page).to_text()
@@ -0,0 +1,163 @@
+# --- Imports --- #
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+
+from lazy_imports import LazyModule
+from pdf_parsing import pdf_parser
+from pdf_parsing.sharding import SHARDS_PER_WORKER, shard_pages
+
+# Parser libraries are imported by the first document opened with them
+pdfplumber = LazyModule("pdfplumber")
+PyPDF2 = LazyModule("PyPDF2")
+pypdf = LazyModule("pypdf")
+from tracing.stage_tracing import stage
+
+# --- Page records --- #
+@dataclass
+class PageRecord:
+    """Text of a single page, as yielded by iter_pages."""
+    page_number: int # 0-based
+    text: str
+    elapsed: float # seconds spent extracting the page
+
+# --- Document openers --- #
+# Every worker process opens its own handle: pdfplumber/pypdf documents hold file
+# handles and caches that cannot be pickled or shared across processes.
+@contextmanager
+def _open_pdfplumber(pdf_path):
+    with pdfplumber.open(pdf_path) as reader:
+        yield reader.pages
+
+@contextmanager
+def _open_pypdf(pdf_path):
+    yield pypdf.PdfReader(pdf_path).pages
+
+@contextmanager
+def _open_pypdf2(pdf_path):
+    yield PyPDF2.PdfReader(pdf_path).pages
+
+# --- Parser registry --- #
+# Maps a parser name to (document opener, page-level extractor).
+PARSERS = {
+    "pypdf": (_open_pypdf, pdf_parser.pypdf_page_text),
+    "pypdf2": (_open_pypdf2, pdf_parser.pypdf_page_text),
+    "pdfplumber": (_open_pdfplumber, pdf_parser.pdf_plumber_page_text),
+    "custom_settings": (_open_pdfplumber, pdf_parser.custom_settings_page_text),
+    "section_markers": (_open_pdfplumber, pdf_parser.section_markers_page_text),
+    "layout": (_open_pdfplumber, pdf_parser.layout_page_text),
+}
+
+def get_parser(parser):
+    """Returns the (opener, page extractor) pair registered under `parser`."""
+    try:
+        return PARSERS[parser]
+    except KeyError:
+        raise ValueError(f"Unknown parser '{parser}'. Available parsers: {', '.join(PARSERS)}.")
+
+# Lazy modules each parser needs, imported up front by load_parser
+_PARSER_MODULES = {
+    "pypdf": (pypdf,),
+    "pypdf2": (PyPDF2,),
+    "pdfplumber": (pdfplumber,),
+    "custom_settings": (pdfplumber,),
+    "section_markers": (pdfplumber,),
+    "layout": (pdfplumber, LazyModule("pdf_parsing.layout")),
+}
+
+def load_parser(parser):
+    """
+    Same as get_parser, also importing the parser's backend library now
+
+    get_parser is only a lookup: the library is otherwise imported by the first document
+    opened. Long-lived processes call this once at startup so their first job does not pay for it.
+    """
+    entry = get_parser(parser)
+    for module in _PARSER_MODULES[parser]:
+        module.__name__ # first attribute access imports the module
+    return entry
+
+def count_pages(pdf_path, parser="pypdf"):
+    """Returns the number of pages of a PDF file."""
+    opener, _ = get_parser(parser)
+    with opener(pdf_path) as pages:
+        return len(pages)
+
+# --- Workers --- #
+def _iter_shard(pdf_path, parser, page_numbers):
+    """Yields a PageRecord for each page of a set of pages, opening the document once."""
+    opener, page_text = get_parser(parser)
+    with opener(pdf_path) as pages:
+        for page_number in page_numbers:
+            start = time.perf_counter()
+            text = page_text(pages[page_number])
+            yield PageRecord(page_number, text, time.perf_counter() - start)
+
+def _extract_shard(pdf_path, parser, page_numbers):
+    """Extracts the records of a contiguous set of pages. Runs inside a worker process."""
+    return list(_iter_shard(pdf_path, parser, page_numbers))
+
+# --- Streaming API --- #
+def iter_pages(pdf_path, parser="pypdf", pages=None, workers=1):
+    """
+    Yields a PageRecord per page as soon as it is parsed, in page order
+
+    Args:
+        pdf_path: Path to the PDF file
+        parser: Name of the parser to use (see PARSERS)
+        pages: Optional list of page numbers (0-based) to extract. Defaults to all pages
+        workers: Number of worker processes. None uses os.cpu_count(); 1 parses in this process
+    Returns:
+        Generator of PageRecord objects
+    """
+    if pages is None:
+        pages = range(count_pages(pdf_path, parser))
+    pages = list(pages)
+
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(pages))
+
+    with stage("parse", parser=parser, workers=workers) as parse_stage:
+        page_seconds = []
+        parse_stage.set(pages=0, page_seconds=page_seconds)
+        for record in _iter_records(pdf_path, parser, pages, workers):
+            page_seconds.append(record.elapsed)
+            parse_stage.set(pages=len(page_seconds))
+            yield record
+
+def _iter_records(pdf_path, parser, pages, workers):
+    if workers <= 1:
+        yield from _iter_shard(pdf_path, parser, pages)
+        return
+
+    shards = shard_pages(pages, min(len(pages), workers * SHARDS_PER_WORKER))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # executor.map yields shard results in submission order, which keeps pages in order
+        results = executor.map(_extract_shard, [pdf_path] * len(shards), [parser] * len(shards), shards)
+        for shard_records in results:
+            yield from shard_records
+
+def join_pages(records):
+    """Builds the document text from page records (or page strings) in a single pass."""
+    return "".join(record if isinstance(record, str) else record.text for record in records)
+
+# --- Entry point --- #
+def extract_pages(pdf_path, parser="pypdf", pages=None, workers=None):
+    """
+    Extracts the text of each page of a PDF file, sharding pages across a process pool
+
+    Args:
+        pdf_path: Path to the PDF file
+        parser: Name of the parser to use (see PARSERS)
+        pages: Optional list of page numbers (0-based) to extract. Defaults to all pages
+        workers: Number of worker processes. Defaults to os.cpu_count(); 1 runs serially
+    Returns:
+        List with the text of each requested page, in page order
+    """
+    return [record.text for record in iter_pages(pdf_path, parser=parser, pages=pages, workers=workers)]
+
+def extract_text(pdf_path, parser="pypdf", pages=None, workers=None):
+    """Extracts the text of a PDF file in parallel. Gives the same output as the serial pdf_parser readers."""
+    return join_pages(iter_pages(pdf_path, parser=parser, pages=pages, workers=workers))
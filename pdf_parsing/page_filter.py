@@ -0,0 +1,157 @@
+# --- Imports --- #
+import re
+import sys
+import unicodedata
+from dataclasses import dataclass
+
+# --- Page scoring --- #
+# Terms found on balance sheet and income statement (DRE) pages, matched on lowercase
+# text with accents stripped. Weights add up per distinct term found on the page.
+KEYWORDS = {
+    r"balanco patrimonial": 3,
+    r"ativo circulante": 3,
+    r"ativo nao circulante": 3,
+    r"passivo circulante": 3,
+    r"passivo nao circulante": 3,
+    r"patrimonio liquido": 2,
+    r"total do ativo": 3,
+    r"total do passivo": 3,
+    r"demonstrac(?:ao|oes) d[oe]s? resultados?": 3,
+    r"receita (?:operacional )?liquida": 2,
+    r"lucro (?:liquido|bruto)|prejuizo (?:liquido|do exercicio)": 2,
+    r"resultado (?:operacional|financeiro|antes)": 2,
+    r"imposto de renda": 1,
+    r"caixa e equivalentes": 1,
+    r"capital social": 1,
+    r"imobilizado|intangivel": 1,
+}
+
+# Terms typical of auditor reports and explanatory notes, which the extraction never uses
+NEGATIVE_KEYWORDS = {
+    r"relatorio do auditor|auditores independentes": -3,
+    r"opiniao|base para opiniao": -2,
+    r"responsabilidades? d[ao]s? (?:auditor|administracao)": -3,
+    r"notas explicativas as demonstracoes": -4, # heading of the notes pages
+    r"notas? explicativas?": -1,
+}
+
+_PATTERNS = [(re.compile(pattern), weight) for pattern, weight in {**KEYWORDS, **NEGATIVE_KEYWORDS}.items()]
+
+# Brazilian formatted amounts, e.g. 1.234.567, (12.345), -1.234,56
+_NUMBER = re.compile(r"\(?-?\d{1,3}(?:\.\d{3})+(?:,\d+)?\)?|\(?-?\d+,\d{2}\)?")
+_TOKEN = re.compile(r"\S+")
+
+# Weight of the numeric density (share of amounts among the page's tokens) in the score
+NUMERIC_WEIGHT = 10
+# Pages scoring at least this are considered financial statement pages
+MIN_SCORE = 6
+
+def normalize(text):
+    """Lowercases text and strips its accents."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+def numeric_density(text):
+    """Share of whitespace-separated tokens that are formatted amounts."""
+    tokens = _TOKEN.findall(text)
+    if not tokens:
+        return 0.0
+    return len(_NUMBER.findall(text)) / len(tokens)
+
+def score_page(text):
+    """Scores how likely a page is to hold the balance sheet or the income statement."""
+    normalized = normalize(text)
+    keyword_score = sum(weight for pattern, weight in _PATTERNS if pattern.search(normalized))
+    return keyword_score + NUMERIC_WEIGHT * numeric_density(text)
+
+# --- Page selection --- #
+def select_pages(page_texts, min_score=MIN_SCORE, neighbors=0):
+    """
+    Picks the balance sheet and income statement pages of a document
+
+    Args:
+        page_texts: Text of each page, in page order
+        min_score: Minimum score of a selected page
+        neighbors: Also select this many pages before and after each selected page,
+            for statements continuing on a page without headings
+    Returns:
+        Sorted list of selected page numbers (0-based). All pages if none scores high enough
+    """
+    selected = {page_num for page_num, text in enumerate(page_texts) if score_page(text) >= min_score}
+    if not selected:
+        return list(range(len(page_texts)))
+
+    for page_num in list(selected):
+        for offset in range(1, neighbors + 1):
+            selected.update({page_num - offset, page_num + offset})
+    return sorted(page_num for page_num in selected if 0 <= page_num < len(page_texts))
+
+def filter_text(page_texts, min_score=MIN_SCORE, neighbors=0):
+    """Returns the text of the selected pages only, joined in page order."""
+    return "".join(page_texts[page_num] for page_num in select_pages(page_texts, min_score, neighbors))
+
+# --- Section pages --- #
+# Terms marking the pages of each DocumentStructure section, matched like KEYWORDS
+SECTION_PATTERNS = {
+    "ativo_circulante": r"ativo circulante|\bativo\b",
+    "ativo_nao_circulante": r"ativo nao circulante|realizavel a longo prazo|imobilizado",
+    "passivo_circulante": r"passivo circulante|\bpassivo\b",
+    "passivo_nao_circulante": r"passivo nao circulante|exigivel a longo prazo",
+    "patrimonio_liquido": r"patrimonio liquido",
+    "demonstracao_do_resultado": r"demonstrac(?:ao|oes) d[oe]s? resultados?|receita (?:operacional )?liquida|lucro bruto",
+}
+
+def select_section_pages(page_texts, section, min_score=MIN_SCORE, neighbors=0):
+    """
+    Picks the pages of one section among the balance sheet and income statement pages
+
+    Returns:
+        Sorted list of page numbers (0-based). All selected pages if none mentions the section
+    """
+    selected = select_pages(page_texts, min_score, neighbors)
+    pattern = re.compile(SECTION_PATTERNS[section])
+    section_pages = [page_num for page_num in selected if pattern.search(normalize(page_texts[page_num]))]
+    return section_pages or selected
+
+def filter_section_text(page_texts, section, min_score=MIN_SCORE, neighbors=0):
+    """Returns the text of the pages of one section only, joined in page order."""
+    return "".join(page_texts[page_num] for page_num in select_section_pages(page_texts, section, min_score, neighbors))
+
+# --- Reporting --- #
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+@dataclass
+class FilterReport:
+    pages: int
+    selected_pages: list
+    tokens: int
+    selected_tokens: int
+
+    @property
+    def savings(self):
+        """Share of prompt tokens removed by the filter."""
+        return 1 - self.selected_tokens / self.tokens if self.tokens else 0.0
+
+def filter_report(page_texts, min_score=MIN_SCORE, neighbors=0):
+    """Computes the token savings of the page filter for one document."""
+    selected_pages = select_pages(page_texts, min_score, neighbors)
+    return FilterReport(
+        pages=len(page_texts),
+        selected_pages=selected_pages,
+        tokens=estimate_tokens("".join(page_texts)),
+        selected_tokens=estimate_tokens("".join(page_texts[page_num] for page_num in selected_pages)),
+    )
+
+if __name__ == "__main__":
+    # Reporting mode: python -m pdf_parsing.page_filter data/*.pdf
+    from pdf_parsing import page_extraction
+
+    print(f"{'document':<40}{'pages':>7}{'kept':>6}{'tokens':>9}{'kept':>9}{'savings':>9}")
+    for pdf_path in sys.argv[1:]:
+        report = filter_report(page_extraction.extract_pages(pdf_path, workers=1))
+        print(
+            f"{pdf_path:<40}{report.pages:>7}{len(report.selected_pages):>6}"
+            f"{report.tokens:>9}{report.selected_tokens:>9}{report.savings:>9.0%}"
+        )
@@ -1,34 +1,180 @@
 # --- Imports --- #
-import io
-import fitz
-import pdfplumber
-import PyPDF2
-import pytesseract
+import os
 from typing import List
 from dataclasses import dataclass
-from pypdf import PdfReader
+from concurrent.futures import ProcessPoolExecutor
 
-from PIL import Image
+from lazy_imports import LazyModule
+from tracing.stage_tracing import stage
+
+# PDF and OCR backends are imported on first use (refer to benchmarks/import_time.py)
+fitz = LazyModule("fitz")
+pdfplumber = LazyModule("pdfplumber")
+PyPDF2 = LazyModule("PyPDF2")
+pypdf = LazyModule("pypdf")
+pytesseract = LazyModule("pytesseract")
+Image = LazyModule("PIL.Image")
 
 # --- PDF OCR --- #
-def pdf_ocr(pdf_path, num_pages=None):
+# Pages whose text layer has fewer non-whitespace characters than this are considered
+# scanned and are OCR'd by extract_pages_hybrid.
+MIN_TEXT_CHARS = 50
+
+def render_page(page, dpi=300):
+    """Renders a fitz page into a grayscale PIL image straight from the pixmap samples (no PNG round trip)."""
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+def _limit_tesseract_threads():
+    # Pages already run in parallel, so each Tesseract process gets a single thread
+    # instead of competing with the other workers for every core.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+def _ocr_page(pdf_path, page_num, dpi=300, lang='por'):
+    """Renders and OCRs a single page. Runs inside a worker process."""
+    with fitz.open(pdf_path) as pdf_document:
+        page = pdf_document.load_page(page_num)
+        if dpi is None:
+            from pdf_parsing import render_planner
+            dpi = render_planner.plan_page(page).ocr_dpi
+        img = render_page(page, dpi=dpi)
+    return pytesseract.image_to_string(img, lang=lang)
+
+def ocr_pages(pdf_path, page_nums, dpi=300, lang='por', workers=None):
+    """
+    OCRs a set of pages of a PDF file on a process pool
+
+    Args:
+        pdf_path: Path to the PDF file
+        page_nums: Page numbers (0-based) to OCR
+        dpi: Render resolution. None opts in to the per-page resolution of pdf_parsing/render_planner.py,
+            whose OCR accuracy has not been measured yet
+        lang: Tesseract language
+        workers: Number of worker processes. Defaults to os.cpu_count(); 1 runs serially
+    Returns:
+        Dict mapping each page number to its OCR'd text
+    """
+    page_nums = list(page_nums)
+    workers = min(workers or os.cpu_count() or 1, len(page_nums))
+
+    if workers <= 1:
+        return {page_num: _ocr_page(pdf_path, page_num, dpi, lang) for page_num in page_nums}
+
+    n = len(page_nums)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_limit_tesseract_threads) as executor:
+        texts = executor.map(_ocr_page, [pdf_path] * n, page_nums, [dpi] * n, [lang] * n)
+        return dict(zip(page_nums, texts))
+
+def pdf_ocr(pdf_path, num_pages=None, workers=None):
     """Extracts text from a PDF file using OCR."""
     with fitz.open(pdf_path) as pdf_document:
-        ocr_text = ""
-
         if not num_pages:
             num_pages = pdf_document.page_count
 
-        for page_num in range(num_pages):
-            # Select page
-            page = pdf_document.load_page(page_num)
+    ocr_texts = ocr_pages(pdf_path, range(num_pages), workers=workers)
+    ocr_text = "".join(ocr_texts[page_num] + "\n" for page_num in range(num_pages))
+
+    return ocr_text
 
-            # Render page as image
-            pix = page.get_pixmap(dpi=300)
-            img = Image.open(io.BytesIO(pix.tobytes("png")))
+def needs_ocr(text, min_chars=MIN_TEXT_CHARS):
+    """Returns True when a page's text layer is missing or too sparse to be trusted."""
+    return not text or sum(not char.isspace() for char in text) < min_chars
 
-            # Apply OCR
-            ocr_text += pytesseract.image_to_string(img, lang='por') + "\n"
+def extract_pages_hybrid(pdf_path, min_chars=MIN_TEXT_CHARS, dpi=300, workers=None):
+    """
+    Extracts the text of each page with pdfplumber, OCR'ing only the pages without a usable text layer
+
+    Args:
+        pdf_path: Path to the PDF file
+        min_chars: Pages with fewer non-whitespace characters are OCR'd
+        dpi: Render resolution of the OCR'd pages. None plans it per page (refer to ocr_pages)
+        workers: Number of OCR worker processes
+    Returns:
+        List with the text of each page, in page order
+    """
+    with pdfplumber.open(pdf_path) as reader:
+        page_texts = [pdf_plumber_page_text(page) or "" for page in reader.pages]
+
+    sparse_pages = [page_num for page_num, text in enumerate(page_texts) if needs_ocr(text, min_chars)]
+    with stage("ocr", pages=len(page_texts), ocr_pages=len(sparse_pages), dpi=dpi or "planned"):
+        for page_num, text in ocr_pages(pdf_path, sparse_pages, dpi=dpi, workers=workers).items():
+            page_texts[page_num] = text
+
+    return page_texts
+
+def extract_text_hybrid(pdf_path, min_chars=MIN_TEXT_CHARS, dpi=300, workers=None):
+    """Extracts text from a PDF file, OCR'ing only scanned or near-empty pages."""
+    return "".join(extract_pages_hybrid(pdf_path, min_chars, dpi, workers))
+
+# --- Page-level extractors --- #
+# Each function turns one already-opened page into text. The document-level
+# readers below and pdf_parsing.page_extraction both build on them, so the
+# serial and the parallel paths always produce the same text.
+def pdf_plumber_page_text(page):
+    """Extracts the text of a single pdfplumber page."""
+    return page.extract_text(layout=False)
+
+def custom_settings_page_text(page):
+    """Extracts the text of a single pdfplumber page keeping its layout."""
+    return page.extract_text(
+        x_tolerance=3,
+        y_tolerance=1.2,
+        layout=True,
+        keep_blank_chars=True,
+    )
+
+def section_markers_page_text(page):
+    """Extracts the text of a single pdfplumber page tagging each word as LEFT/RIGHT."""
+    lines = []
+
+    # Get page dimensions
+    width = page.width
+
+    # Extract words with position information
+    words = page.extract_words(
+        keep_blank_chars=True,
+        x_tolerance=3,
+        y_tolerance=3,
+    )
+
+    current_line_y = words[0]['top'] if words else 0
+    line_parts = []
+
+    for word in words:
+        # If we're on a new line
+        if abs(word['top'] - current_line_y) > 5: # adjust tolerance as needed
+            lines.append("".join(line_parts) + "\n")
+            line_parts = []
+            current_line_y = word['top']
+
+        # Add position marker
+        position = "LEFT" if word['x0'] < (width / 2) else "RIGHT"
+        line_parts.append(f"[{position}]{word['text']}")
+
+    lines.append("".join(line_parts) + "\n")
+
+    return "".join(lines)
+
+def layout_page_text(page):
+    """Extracts the rows of a single pdfplumber page as 'label|value|value' lines, with its period columns aligned."""
+    # numpy is only imported when the layout engine is used (refer to pdf_parsing/layout.py)
+    from pdf_parsing import layout
+    return layout.layout_page_text(page)
+
+def page_tables(page):
+    """Extracts the tables of a single pdfplumber page using text alignment."""
+    return page.extract_tables(
+        table_settings={
+            "vertical_strategy": "text",
+            "horizontal_strategy": "text",
+            "intersection_y_tolerance": 4,
+            "intersection_x_tolerance": 30,
+        }
+    )
+
+def pypdf_page_text(page):
+    """Extracts the text of a single pypdf/PyPDF2 page."""
+    return page.extract_text()
 
 # --- PDF Reader --- #
 def extract_text_from_pdf_pdf_plumber(pdf_path, num_pages=None):
@@ -36,7 +182,7 @@ def extract_text_from_pdf_pdf_plumber(pdf_path, num_pages=None):
     text = ""
     with pdfplumber.open(pdf_path) as reader:
         pages_to_read = reader.pages[:num_pages+1] if num_pages else reader.pages
-        text = "".join(page.extract_text(layout=False) for page in pages_to_read)
+        text = "".join(pdf_plumber_page_text(page) for page in pages_to_read)
 
     if not text:
         text = pdf_ocr(pdf_path, num_pages)
@@ -45,76 +191,38 @@ def extract_text_from_pdf_pdf_plumber(pdf_path, num_pages=None):
 
 def extract_text_with_custom_settings(pdf_path):
     with pdfplumber.open(pdf_path) as reader:
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text(
-                x_tolerance=3,
-                y_tolerance=1.2,
-                layout=True,
-                keep_blank_chars=True,
-            )
+        text = "".join(custom_settings_page_text(page) for page in reader.pages)
     return text
 
 def extract_tables(pdf_path):
     with pdfplumber.open(pdf_path) as reader:
         all_tables = []
         for page in reader.pages:
-            tables = page.extract_tables(
-                table_settings={
-                    "vertical_strategy": "text",
-                    "horizontal_strategy": "text",
-                    "intersection_y_tolerance": 4,
-                    "intersection_x_tolerance": 30,
-                }
-            )
-            all_tables.extend(tables)
+            all_tables.extend(page_tables(page))
     return all_tables
 
 def extract_with_section_markers(pdf_path):
     with pdfplumber.open(pdf_path) as reader:
-        text = ""
-        for page in reader.pages:
-            # Get page dimensions
-            width = page.width
+        text = "".join(section_markers_page_text(page) for page in reader.pages)
 
-            # Extract words with position information
-            words = page.extract_words(
-                keep_blank_chars=True,
-                x_tolerance=3,
-                y_tolerance=3,
-            )
-
-            current_line_y = words[0]['top'] if words else 0
-            line_text = ""
-
-            for word in words:
-                # If we're on a new line
-                if abs(word['top'] - current_line_y) > 5: # adjust tolerance as needed
-                    text += line_text + "\n"
-                    line_text = ""
-                    current_line_y = word['top']
-
-                # Add position marker
-                position = "LEFT" if word['x0'] < (width / 2) else "RIGHT"
-                line_text += f"[{position}]{word['text']}"
+    return text
 
-            text += line_text + "\n"
+def extract_with_layout(pdf_path):
+    """Layout-aware replacement of extract_with_section_markers: side-by-side blocks and period columns are rebuilt."""
+    with pdfplumber.open(pdf_path) as reader:
+        text = "".join(layout_page_text(page) for page in reader.pages)
 
     return text
 
 # --- PDF Reader PyPDF2 --- #
 def extract_text_from_pdf_pypdf2(pdf_path):
     reader = PyPDF2.PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text()
+    text = "".join(pypdf_page_text(page) for page in reader.pages)
     return text
 
 # --- PDF Reader pypdf --- #
 def extract_text_from_pdf_pypdf(pdf_path):
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text()
+    reader = pypdf.PdfReader(pdf_path)
+    text = "".join(pypdf_page_text(page) for page in reader.pages)
 
     return text
\ No newline at end of file
@@ -0,0 +1,190 @@
+# --- Imports --- #
+import math
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+
+from lazy_imports import LazyModule
+
+fitz = LazyModule("fitz")
+
+# --- Config --- #
+# Previous fixed render resolution of OCR and table detection, the reference of the report
+REFERENCE_DPI = 300
+# Font size, in pixels, OCR renders are planned for. 24 px (~12 px x-height) is what the previous
+# fixed 300 dpi gave the 6 pt text of the sample statements; larger text is rendered at less dpi
+OCR_FONT_PX = 24
+# Share of the characters allowed to be smaller than the size OCR is planned for (footnotes, superscripts)
+SMALL_TEXT_SHARE = 0.1
+# Resolution bounds of OCR renders; pages without a text layer are planned at DEFAULT_OCR_DPI
+MIN_OCR_DPI = 150
+MAX_OCR_DPI = 400
+DEFAULT_OCR_DPI = 300
+# Table Transformer resizes every page to 1024x1024, whatever its aspect ratio (refer to
+# table_detection.TableDetector.load). The shortest side is rendered at 1024 px at least, so
+# that the resize never upsamples either side; more pixels only cost rasterization time
+DETECTION_SHORT_SIDE_PX = 1024
+MIN_DETECTION_DPI = 72
+# An image covering this share of the page makes it a scan
+SCAN_COVERAGE = 0.8
+# Planned resolutions are rounded up to a multiple of this
+DPI_STEP = 25
+# Margin added around a table before re-rendering it, in PDF points, as detection boxes
+# come from a coarser render
+CLIP_MARGIN = 4
+
+# --- Page plans --- #
+@dataclass
+class PagePlan:
+    """Render resolutions picked for one page, with what they were picked from."""
+    page_number: int # 0-based
+    width: float # page size, in PDF points
+    height: float
+    font_size: float # size of the small text of the text layer, in points (None without text layer)
+    image_dpi: float # resolution of the page's scanned image (None when not a scan)
+    detection_dpi: int
+    ocr_dpi: int
+
+    def pixels(self, dpi, bbox=None):
+        """Pixels of the whole page, or of the `bbox` region (PDF points), rendered at `dpi`."""
+        if bbox is not None:
+            x0, top, x1, bottom = bbox
+            width, height = x1 - x0 + 2 * CLIP_MARGIN, bottom - top + 2 * CLIP_MARGIN
+        else:
+            width, height = self.width, self.height
+        return math.ceil(width * dpi / 72) * math.ceil(height * dpi / 72)
+
+def _round_up(dpi):
+    return int(math.ceil(dpi / DPI_STEP) * DPI_STEP)
+
+def small_font_size(page, small_share=SMALL_TEXT_SHARE):
+    """
+    Font size (points) above which all but `small_share` of the page's characters are set
+
+    Returns:
+        Font size, or None when the page has no text layer
+    """
+    sizes, counts = [], []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                chars = len(span["text"].strip())
+                if chars:
+                    sizes.append(span["size"])
+                    counts.append(chars)
+    if not sizes:
+        return None
+    sizes, counts = np.array(sizes), np.array(counts, dtype=float)
+    order = np.argsort(sizes)
+    cumulative = np.cumsum(counts[order]) / counts.sum()
+    return float(sizes[order][np.searchsorted(cumulative, small_share)])
+
+def scan_dpi(page, coverage=SCAN_COVERAGE):
+    """
+    Resolution of the image a scanned page is made of
+
+    Returns:
+        Lowest of the horizontal and vertical resolutions of the image covering the page, or
+        None when no image covers at least `coverage` of it
+    """
+    page_area = page.rect.width * page.rect.height
+    best = None
+    for image in page.get_image_info():
+        x0, y0, x1, y1 = image["bbox"]
+        if (x1 - x0) * (y1 - y0) < coverage * page_area or x1 <= x0 or y1 <= y0:
+            continue
+        dpi = min(image["width"] * 72 / (x1 - x0), image["height"] * 72 / (y1 - y0))
+        best = dpi if best is None else max(best, dpi)
+    return best
+
+def plan_page(page):
+    """
+    Picks the lowest render resolutions of a fitz page that keep detection and OCR accurate
+
+    - Detection: the page's shortest side at DETECTION_SHORT_SIDE_PX pixels, so that resizing
+      to the detector's 1024x1024 input only downsamples.
+    - OCR: small text rendered OCR_FONT_PX pixels high, from the font sizes of the text layer.
+      Scans are rendered at their own resolution (more pixels add no detail), within the
+      OCR bounds.
+    Returns:
+        PagePlan
+    """
+    width, height = page.rect.width, page.rect.height
+    font_size = small_font_size(page)
+    image_dpi = scan_dpi(page)
+
+    detection_dpi = max(MIN_DETECTION_DPI, _round_up(DETECTION_SHORT_SIDE_PX * 72 / min(width, height)))
+    if image_dpi is not None:
+        ocr_dpi = image_dpi
+    elif font_size:
+        ocr_dpi = OCR_FONT_PX * 72 / font_size
+    else:
+        ocr_dpi = DEFAULT_OCR_DPI
+    ocr_dpi = min(MAX_OCR_DPI, max(MIN_OCR_DPI, _round_up(ocr_dpi)))
+
+    return PagePlan(page.number, width, height, font_size, image_dpi, detection_dpi, ocr_dpi)
+
+def fixed_plan(page, dpi):
+    """Plan rendering a page at the same, given resolution for detection and OCR."""
+    return PagePlan(page.number, page.rect.width, page.rect.height, None, None, dpi, dpi)
+
+def plan_document(pdf_path, pages=None):
+    """Returns the PagePlan of each requested page (0-based numbers, default all) of a PDF file."""
+    with fitz.open(pdf_path) as pdf_document:
+        if pages is None:
+            pages = range(pdf_document.page_count)
+        return [plan_page(pdf_document.load_page(page_number)) for page_number in pages]
+
+# --- Rendering --- #
+def render_clip(page, bbox, dpi, margin=CLIP_MARGIN):
+    """
+    Renders a region of a fitz page into an RGB numpy array
+
+    Args:
+        page: fitz.Page object
+        bbox: (x0, top, x1, bottom) of the region, in PDF points
+        dpi: Render resolution
+        margin: Points added on every side of the region, within the page
+    Returns:
+        (height, width, 3) uint8 array
+    """
+    x0, top, x1, bottom = bbox
+    clip = fitz.Rect(x0 - margin, top - margin, x1 + margin, bottom + margin) & page.rect
+    pix = page.get_pixmap(dpi=dpi, clip=clip, colorspace=fitz.csRGB, alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+
+# --- Reporting --- #
+def report(plans, reference_dpi=REFERENCE_DPI):
+    """Share of the pixels rendered at `reference_dpi` that the planned detection and OCR renders need."""
+    reference = sum(plan.pixels(reference_dpi) for plan in plans)
+    return {
+        "pages": len(plans),
+        "detection_pixels": sum(plan.pixels(plan.detection_dpi) for plan in plans) / reference if reference else None,
+        "ocr_pixels": sum(plan.pixels(plan.ocr_dpi) for plan in plans) / reference if reference else None,
+    }
+
+if __name__ == "__main__":
+    # Reporting mode: python -m pdf_parsing.render_planner data/*.pdf
+    # The pdfplumber tables of each page stand in for the detected tables re-rendered for OCR
+    from pdf_table_extractor import iter_document_tables
+
+    all_plans, reference_clips, planned_clips = [], 0, 0
+    for pdf_path in sys.argv[1:]:
+        plans = plan_document(pdf_path)
+        all_plans.extend(plans)
+        for plan, page in zip(plans, iter_document_tables(pdf_path)):
+            reference_clips += sum(plan.pixels(REFERENCE_DPI, bbox) for bbox in page.bboxes)
+            planned_clips += sum(plan.pixels(plan.ocr_dpi, bbox) for bbox in page.bboxes)
+            print(
+                f"{pdf_path} p{plan.page_number}: {plan.width:.0f}x{plan.height:.0f} pt, "
+                f"font {plan.font_size or 0:.1f} pt, scan {plan.image_dpi or 0:.0f} dpi -> "
+                f"detection {plan.detection_dpi} dpi, OCR {plan.ocr_dpi} dpi, {len(page.bboxes)} tables"
+            )
+    summary = report(all_plans)
+    reference = sum(plan.pixels(REFERENCE_DPI) for plan in all_plans)
+    print(
+        f"\n{summary['pages']} pages, pixels vs. {REFERENCE_DPI} dpi pages: detection {summary['detection_pixels']:.1%}, "
+        f"OCR of whole pages {summary['ocr_pixels']:.1%}, OCR of table clips {planned_clips / reference:.1%} "
+        f"({reference_clips / reference:.1%} at {REFERENCE_DPI} dpi)"
+    )
@@ -0,0 +1,17 @@
+# Splitting of page ranges across worker processes, shared by the text (page_extraction) and
+# table (pdf_table_extractor) extractors. Kept free of imports so both stay cheap to import.
+
+# Number of shards per worker. More, smaller shards let the first pages reach the
+# consumer sooner, at the cost of re-opening the document once per shard.
+SHARDS_PER_WORKER = 4
+
+def shard_pages(page_numbers, num_shards):
+    """Splits page numbers into `num_shards` contiguous, similarly sized chunks."""
+    size, remainder = divmod(len(page_numbers), num_shards)
+    shards, start = [], 0
+    for shard_index in range(num_shards):
+        end = start + size + (1 if shard_index < remainder else 0)
+        if end > start:
+            shards.append(page_numbers[start:end])
+        start = end
+    return shards
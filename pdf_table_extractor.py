@@ -1,6 +1,90 @@
-import pdfplumber
-import matplotlib.pyplot as plt
-import numpy as np
+import os
+import time
+from dataclasses import dataclass
+
+from lazy_imports import LazyModule
+from pdf_parsing.sharding import SHARDS_PER_WORKER, shard_pages
+from tracing.stage_tracing import stage
+
+pdfplumber = LazyModule("pdfplumber")
+
+@dataclass
+class PageTables:
+    """Tables of a single page, as yielded by iter_document_tables."""
+    page_number: int # 0-based
+    page_dims: tuple # (width, height)
+    tables: list # one list of rows of cells per table
+    bboxes: list # (x0, top, x1, bottom) of each table, in the same order
+    elapsed: float # seconds spent on the page
+
+def page_tables(page, table_settings=None):
+    """
+    Find the tables of a pdfplumber page once and extract their cells
+
+    Returns:
+        Tuple (tables, bboxes)
+    """
+    found = page.find_tables(table_settings or {})
+    return [table.extract() for table in found], [tuple(table.bbox) for table in found]
+
+def _iter_shard(pdf_path, page_numbers, table_settings=None):
+    """Yields the PageTables of a set of pages, opening the document once."""
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_number in page_numbers:
+            start = time.perf_counter()
+            page = pdf.pages[page_number]
+            tables, bboxes = page_tables(page, table_settings)
+            # Release the page's parsed objects, which otherwise stay cached for the whole document
+            page.close()
+            yield PageTables(page_number, (float(page.width), float(page.height)), tables, bboxes, time.perf_counter() - start)
+
+def _extract_shard(pdf_path, page_numbers, table_settings=None):
+    """Extracts the tables of a contiguous set of pages. Runs inside a worker process."""
+    return list(_iter_shard(pdf_path, page_numbers, table_settings))
+
+def iter_document_tables(pdf_path, pages=None, workers=1, table_settings=None):
+    """
+    Yields the tables of each page as soon as they are extracted, in page order
+
+    Args:
+        pdf_path: Path to the PDF file
+        pages: Optional list of page numbers (0-based). Defaults to all pages
+        workers: Number of worker processes. None uses os.cpu_count(); 1 runs in this process
+        table_settings: pdfplumber table settings passed to find_tables
+    Returns:
+        Generator of PageTables objects
+    """
+    if pages is None:
+        with pdfplumber.open(pdf_path) as pdf:
+            pages = range(len(pdf.pages))
+    pages = list(pages)
+    workers = min(workers or os.cpu_count() or 1, len(pages))
+
+    with stage("tables", backend="pdfplumber", workers=workers) as tables_stage:
+        tables_stage.set(pages=0, tables=0)
+        for page in _iter_page_tables(pdf_path, pages, workers, table_settings):
+            tables_stage.set(pages=tables_stage.attributes["pages"] + 1,
+                             tables=tables_stage.attributes["tables"] + len(page.tables))
+            yield page
+
+def _iter_page_tables(pdf_path, pages, workers, table_settings):
+    if workers <= 1:
+        yield from _iter_shard(pdf_path, pages, table_settings)
+        return
+
+    # Only imported when pages are split across processes: multiprocessing is most of this module's import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    shards = shard_pages(pages, min(len(pages), workers * SHARDS_PER_WORKER))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # executor.map yields shard results in submission order, which keeps pages in order
+        n = len(shards)
+        for shard_results in executor.map(_extract_shard, [pdf_path] * n, shards, [table_settings] * n):
+            yield from shard_results
+
+def extract_document_tables(pdf_path, pages=None, workers=1, table_settings=None):
+    """Same as iter_document_tables, collected into a list."""
+    return list(iter_document_tables(pdf_path, pages, workers, table_settings))
 
 def extract_tables_from_pdf(pdf_path, page_number=0):
     """
@@ -18,25 +102,27 @@ def extract_tables_from_pdf(pdf_path, page_number=0):
         
         page = pdf.pages[page_number]
         
-        # Extract tables
-        tables = page.extract_tables()
+        # Find the tables once and extract their cells (extract_tables would find them again)
+        table_bboxes = page.find_tables()
+        tables = [table.extract() for table in table_bboxes]
         
         # Get page dimensions for visualization
         width = float(page.width)
         height = float(page.height)
         
-        # Get table bounding boxes for visualization
-        table_bboxes = page.find_tables()
-        
         return {
             'tables': tables,
             'bboxes': table_bboxes,
             'page_dims': (width, height)
         }
 
-def visualize_tables(pdf_path, page_number=0):
+def visualize_tables(pdf_path, page_number=0, bboxes=None):
     """
     Visualize detected tables in the PDF
+
+    Args:
+        bboxes: Table bounding boxes already found for this page (tuples or pdfplumber tables).
+            Tables are only searched again when not given.
     """
     with pdfplumber.open(pdf_path) as pdf:
         page = pdf.pages[page_number]
@@ -45,9 +131,10 @@ def visualize_tables(pdf_path, page_number=0):
         img = page.to_image()
         
         # Draw rectangles around tables
-        tables = page.find_tables()
-        for table in tables:
-            img.draw_rect(table.bbox)
+        if bboxes is None:
+            bboxes = page.find_tables()
+        for bbox in bboxes:
+            img.draw_rect(getattr(bbox, "bbox", bbox))
         
         # Show the image
         img.show()
@@ -96,7 +183,7 @@ def process_pdf_tables(pdf_path, page_number=0):
         print("\n" + "="*50 + "\n")
     
     # Visualize tables
-    visualize_tables(pdf_path, page_number)
+    visualize_tables(pdf_path, page_number, result['bboxes'])
     
     return tables
 
@@ -0,0 +1,314 @@
+"""
+Local extraction service
+
+Keeps the parsers, the TATR table detector and the LLM clients warm in one long-lived process
+and processes uploaded PDFs from a bounded job queue, so a document's latency excludes imports
+and model loading.
+
+Usage:
+    python service.py --port 8000 --workers 2 --queue-size 16 [--tables] [--no-llm]
+
+    curl -X POST --data-binary @data/atradius.pdf -H "Content-Type: application/pdf" \\
+        "http://localhost:8000/jobs?prefilter=1&tables=0"         -> 202 {"job_id": ...}
+    curl http://localhost:8000/jobs/<job_id>                     -> status and timings
+    curl http://localhost:8000/jobs/<job_id>/result              -> extraction result
+    curl http://localhost:8000/health                            -> queue depth and warm components
+
+A full queue answers 429 with a Retry-After header instead of accepting more work.
+"""
+# --- Python modules --- #
+import json
+import time
+import uuid
+import queue
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# --- Custom modules for the project --- #
+from pdf_parsing import page_extraction
+from pdf_parsing import cache as extraction_cache
+from pdf_parsing import page_filter
+from structured_output.dataframe_builder import build_dataframe
+from tracing.stage_tracing import stage
+
+# --- Jobs --- #
+class Job:
+    def __init__(self, pdf_path, options):
+        self.id = uuid.uuid4().hex
+        self.pdf_path = pdf_path
+        self.options = options
+        self.status = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.timings = {}
+        self.result = None
+        self.error = None
+
+    def summary(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "options": self.options,
+            "created": self.created,
+            "queue_seconds": (self.started or time.time()) - self.created,
+            "run_seconds": (self.finished or time.time()) - self.started if self.started else None,
+            "timings": self.timings,
+            "error": self.error,
+        }
+
+class _LockedDetector:
+    """Serializes the workers' calls to the shared TableDetector (one model, one device)."""
+
+    def __init__(self, detector):
+        self.detector = detector
+        self.lock = threading.Lock()
+
+    def detect(self, *args, **kwargs):
+        with self.lock:
+            return self.detector.detect(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # Settings the pipeline reads from the detector (batch_size...) come from the wrapped one
+        return getattr(self.detector, name)
+
+class ExtractionService:
+    """
+    Warm components, a bounded job queue and the worker threads processing it
+
+    The in-process queue stands in for a real broker: submitting to a full queue fails at
+    once (backpressure) rather than piling up uploads in memory. LLM requests of every worker
+    run on one event loop thread, so the async OpenAI clients are reused across jobs.
+    """
+
+    def __init__(self, workers=2, queue_size=16, tables=False, llm=True, parser="pypdf", max_finished_jobs=1000,
+                 upload_dir=None, use_cache=None):
+        self.workers = workers
+        self.parser = parser
+        # Page texts of documents uploaded again come from the extraction cache (None follows EXTRACTION_CACHE)
+        self.use_cache = use_cache
+        self.tables = tables
+        self.llm = llm
+        self.max_finished_jobs = max_finished_jobs
+        self.upload_dir = Path(upload_dir or tempfile.mkdtemp(prefix="extraction-service-"))
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.jobs = OrderedDict()
+        self.jobs_lock = threading.Lock()
+        self.warm = {}
+        self.detector = None
+        self.loop = None
+
+    # --- Startup --- #
+    def start(self):
+        """Load every component once, then start the workers."""
+        start = time.perf_counter()
+        page_extraction.load_parser(self.parser)
+        self.warm["parser"] = time.perf_counter() - start
+
+        if self.llm:
+            start = time.perf_counter()
+            # Imports pydantic_ai, reads prompts.toml and builds the LLM clients
+            from agents import extraction_agents
+            self.agents = extraction_agents
+            self.loop = asyncio.new_event_loop()
+            threading.Thread(target=self.loop.run_forever, name="llm-loop", daemon=True).start()
+            self.warm["llm"] = time.perf_counter() - start
+
+        if self.tables:
+            start = time.perf_counter()
+            import table_pipeline
+            from table_detection import get_detector
+            self.table_pipeline = table_pipeline
+            detector = get_detector()
+            detector.load()
+            self.detector = _LockedDetector(detector)
+            self.warm["tables"] = time.perf_counter() - start
+
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"worker-{i}", daemon=True).start()
+
+    # --- Jobs --- #
+    def submit(self, pdf_bytes, options):
+        """Queue a job. Raises queue.Full when the service is saturated."""
+        pdf_path = self.upload_dir / f"{uuid.uuid4().hex}.pdf"
+        pdf_path.write_bytes(pdf_bytes)
+        job = Job(str(pdf_path), options)
+        with self.jobs_lock:
+            self.jobs[job.id] = job
+            self._forget_finished_jobs()
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            with self.jobs_lock:
+                del self.jobs[job.id]
+            pdf_path.unlink(missing_ok=True)
+            raise
+        return job
+
+    def get(self, job_id):
+        with self.jobs_lock:
+            return self.jobs.get(job_id)
+
+    def _forget_finished_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ("done", "error")]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            job.status, job.started = "running", time.time()
+            try:
+                with stage("job", document=job.pdf_path, **job.options):
+                    job.result = self.process(job)
+                job.status = "done"
+            except Exception as e:
+                job.status, job.error = "error", f"{type(e).__name__}: {e}"
+            finally:
+                job.finished = time.time()
+                Path(job.pdf_path).unlink(missing_ok=True)
+                self.queue.task_done()
+
+    def _timed(self, job, name, run):
+        start = time.perf_counter()
+        result = run()
+        job.timings[name] = time.perf_counter() - start
+        return result
+
+    def process(self, job):
+        """Parse, extract and optionally detect the tables of one uploaded PDF."""
+        options, result = job.options, {}
+        page_texts = self._timed(job, "parse", lambda: extraction_cache.extract_pages(
+            job.pdf_path, parser=self.parser, workers=1, use_cache=self.use_cache
+        ))
+        text = page_filter.filter_text(page_texts) if options.get("prefilter") else page_extraction.join_pages(page_texts)
+        result["pages"] = len(page_texts)
+
+        if options.get("llm", True):
+            if not self.llm:
+                raise RuntimeError("The service was started with --no-llm")
+            run = self.agents.field_extraction_agent.run(self.agents.field_extraction_prompt, deps=text)
+            extraction = self._timed(job, "llm", lambda: asyncio.run_coroutine_threadsafe(run, self.loop).result())
+            df = build_dataframe(extraction.data)
+            result["fields"] = extraction.data.model_dump()
+            result["dataframe"] = df.to_dict(orient="records")
+        else:
+            result["text"] = text
+
+        if options.get("tables"):
+            if not self.tables:
+                raise RuntimeError("The service was started without --tables")
+            result["tables"] = self._timed(job, "tables", lambda: self.table_pipeline.extract_document_tables(
+                job.pdf_path, detector=self.detector
+            ))
+        return result
+
+    def health(self):
+        with self.jobs_lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {
+            "workers": self.workers,
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "running": statuses.count("running"),
+            "warm_seconds": self.warm,
+        }
+
+# --- HTTP --- #
+def _flag(value):
+    return value.lower() in ("1", "true", "yes")
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    service = None # set by serve()
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/jobs":
+            return self._send(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length", 0))
+        pdf_bytes = self.rfile.read(length)
+        if not pdf_bytes.startswith(b"%PDF"):
+            return self._send(400, {"error": "the request body must be a PDF file"})
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        options = {
+            "prefilter": _flag(query.get("prefilter", "0")),
+            "llm": _flag(query.get("llm", "1" if self.service.llm else "0")),
+            "tables": _flag(query.get("tables", "0")),
+        }
+        if options["llm"] and not self.service.llm:
+            return self._send(400, {"error": "the service was started with --no-llm"})
+        if options["tables"] and not self.service.tables:
+            return self._send(400, {"error": "the service was started without --tables"})
+        try:
+            job = self.service.submit(pdf_bytes, options)
+        except queue.Full:
+            return self._send(429, {"error": "queue full, retry later"}, {"Retry-After": "5"})
+        self._send(202, {"job_id": job.id, "status": job.status})
+
+    def do_GET(self):
+        parts = urlparse(self.path).path.strip("/").split("/")
+        if parts == ["health"]:
+            return self._send(200, self.service.health())
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.service.get(parts[1])
+            if job is None:
+                return self._send(404, {"error": "unknown job"})
+            if len(parts) == 2:
+                return self._send(200, job.summary())
+            if parts[2] == "result":
+                if job.status != "done":
+                    return self._send(409, job.summary())
+                return self._send(200, job.result)
+        self._send(404, {"error": "not found"})
+
+def serve(service, host="127.0.0.1", port=8000):
+    service.start()
+    ServiceHandler.service = service
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    print(f"Serving on http://{host}:{port} (warm-up: {service.warm})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2, help="Jobs processed at once")
+    parser.add_argument("--queue-size", type=int, default=16, help="Queued jobs before new uploads get 429")
+    parser.add_argument("--parser", default="pypdf", choices=sorted(page_extraction.PARSERS))
+    parser.add_argument("--tables", action="store_true", help="Load the TATR detector and accept tables=1 jobs")
+    parser.add_argument("--no-llm", action="store_true", help="Parse only, without loading the LLM agents")
+    parser.add_argument("--no-cache", action="store_true", help="Re-parse every upload instead of using the extraction cache")
+    args = parser.parse_args()
+
+    service = ExtractionService(
+        workers=args.workers, queue_size=args.queue_size, tables=args.tables, llm=not args.no_llm, parser=args.parser,
+        use_cache=False if args.no_cache else None,
+    )
+    serve(service, args.host, args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Columnar export of extraction results
+
+Appends the line items of many documents to a Parquet (or Arrow IPC) dataset partitioned by
+year and section, so analytics can scan only the columns and partitions they need:
+
+    import pyarrow.dataset as ds
+    ds.dataset("exports/line_items", format="parquet", partitioning="hive").to_table(
+        columns=["empresa", "descricao", "valor"], filter=ds.field("secao") == "patrimonio_liquido"
+    )
+
+Backfill from the JSONL written by batch_extract.py:
+
+    python -m structured_output.columnar_export results.jsonl exports/line_items
+"""
+# --- Imports --- #
+import re
+import json
+import uuid
+import argparse
+from decimal import Decimal
+from pathlib import Path
+
+from structured_output.dataframe_builder import build_statement
+
+# --- Schema --- #
+# Decimal column: 38 digits, 6 of them after the point (enough for per share values)
+DECIMAL_SCALE = 6
+PARTITIONING = ("ano", "secao")
+FORMATS = {"parquet": "parquet", "arrow": "arrow"}
+_QUANTUM = Decimal(1).scaleb(-DECIMAL_SCALE)
+_YEAR = re.compile(r"(?:19|20)\d{2}")
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+    except ImportError as e:
+        raise ImportError("Columnar export needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+def schema():
+    pa = _pyarrow()
+    return pa.schema([
+        ("documento", pa.string()),
+        ("empresa", pa.string()),
+        ("unidade_monetaria", pa.string()),
+        ("secao", pa.string()),
+        ("descricao", pa.string()),
+        ("nivel", pa.int8()),
+        ("ordem", pa.int32()),
+        ("periodo", pa.string()),
+        ("ano", pa.int16()),
+        ("valor", pa.decimal128(38, DECIMAL_SCALE)),
+        ("escala", pa.int64()),
+    ])
+
+def period_year(periodo):
+    """Year of a period label ('31.12.2023', '2023', '2023-12-31 00:00:00'), or None."""
+    years = _YEAR.findall(periodo or "")
+    return int(years[-1]) if years else None
+
+# --- Exporter --- #
+class ColumnarExporter:
+    """
+    Buffers line items of many documents and writes them as partitioned Parquet/Arrow files
+
+    Every flush writes new files next to the existing ones (append only), so several runs,
+    or several processes with their own exporter, can write to the same dataset.
+    """
+
+    def __init__(self, root, format="parquet", partitioning=PARTITIONING, rows_per_flush=500_000):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r}, expected one of {sorted(FORMATS)}")
+        self.root = Path(root)
+        self.format = format
+        self.partitioning = list(partitioning)
+        self.rows_per_flush = rows_per_flush
+        self.rows_written = 0
+        self._columns = {name: [] for name in schema().names}
+
+    @property
+    def buffered_rows(self):
+        return len(self._columns["valor"])
+
+    def add(self, statement):
+        """Buffer the line items of a FinancialStatement. Flushes once `rows_per_flush` rows are buffered."""
+        columns = self._columns
+        for item in statement.itens:
+            columns["documento"].append(statement.documento)
+            columns["empresa"].append(statement.empresa)
+            columns["unidade_monetaria"].append(statement.unidade_monetaria)
+            columns["secao"].append(item.secao)
+            columns["descricao"].append(item.descricao)
+            columns["nivel"].append(item.nivel)
+            columns["ordem"].append(item.ordem)
+            columns["periodo"].append(item.periodo)
+            columns["ano"].append(period_year(item.periodo))
+            columns["valor"].append(None if item.valor is None else item.valor.quantize(_QUANTUM))
+            columns["escala"].append(item.escala)
+        if self.buffered_rows >= self.rows_per_flush:
+            self.flush()
+
+    def add_document(self, document, documento=None):
+        """Convert a DocumentStructure (or its dict) and buffer its line items."""
+        self.add(build_statement(document, documento=documento))
+
+    def flush(self):
+        """Write the buffered rows as new files of the dataset."""
+        if not self.buffered_rows:
+            return
+        pa = _pyarrow()
+        table = pa.table(self._columns, schema=schema())
+        pa.dataset.write_dataset(
+            table,
+            self.root,
+            format=FORMATS[self.format],
+            partitioning=self.partitioning,
+            partitioning_flavor="hive",
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.{self.format}",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        self.rows_written += table.num_rows
+        self._columns = {name: [] for name in self._columns}
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_dataset(root, format="parquet"):
+    """Open an exported dataset for columnar scans (pyarrow.dataset.Dataset)."""
+    pa = _pyarrow()
+    partitioning = pa.dataset.partitioning(pa.schema([schema().field(name) for name in PARTITIONING]), flavor="hive")
+    return pa.dataset.dataset(root, format=FORMATS[format], partitioning=partitioning, schema=schema())
+
+# --- Backfill --- #
+def export_jsonl(results_path, root, format="parquet"):
+    """Export the successful records of a batch_extract.py results file. Returns the number of rows written."""
+    with ColumnarExporter(root, format=format) as exporter, open(results_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("status") == "ok":
+                exporter.add_document(record["result"], documento=record["pdf"])
+    return exporter.rows_written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("results", help="JSONL results file written by batch_extract.py")
+    parser.add_argument("root", help="Dataset directory to append to")
+    parser.add_argument("--format", default="parquet", choices=sorted(FORMATS))
+    args = parser.parse_args()
+    print(f"{export_jsonl(args.results, args.root, args.format)} line items written to {args.root}")
+
+if __name__ == "__main__":
+    main()
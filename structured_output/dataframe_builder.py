@@ -0,0 +1,255 @@
+# --- Imports --- #
+import re
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+import pandas as pd
+
+from pdf_parsing.page_filter import normalize
+from structured_output.output_classes import FinancialStatement, LineItem
+
+# --- Config --- #
+# List fields of DocumentStructure holding "[NOME DO CAMPO]: [VALOR_1], [VALOR_2]" entries, in statement order
+SECTIONS = [
+    "ativo_circulante",
+    "ativo_nao_circulante",
+    "passivo_circulante",
+    "passivo_nao_circulante",
+    "patrimonio_liquido",
+    "demonstracao_do_resultado",
+]
+
+# Scale of `unidade_monetaria`, matched on lowercase text with accents stripped. Checked in order.
+UNIT_SCALES = [
+    (r"bilh(?:ao|oes)|\bbi\b", 1e9),
+    (r"milh(?:ao|oes)|\bmm\b|\bmi\b", 1e6),
+    (r"milhares|\bmil\b", 1e3),
+]
+
+# Line items that are not monetary amounts and must not be scaled by the unit
+UNSCALED_ITEMS = re.compile(r"por acao|quantidade de acoes|numero de acoes|\bacoes em circulacao")
+
+# Separators between the values of an entry: "1.234, (567)" or "1.234; 567". A comma followed
+# by digits is a decimal comma (0,2115) and does not split.
+_VALUE_SEPARATOR = re.compile(r"\s*;\s*|,\s+")
+_THOUSANDS_ONLY = r"^\d{1,3}(?:\.\d{3})+$"
+_TOTAL = re.compile(r"\s*(?:total|soma)\b")
+
+# --- Parsing --- #
+def unit_scale(unidade_monetaria):
+    """Multiplier of a monetary unit description, e.g. 'Milhares de R$' -> 1000."""
+    unit = normalize(unidade_monetaria or "")
+    for pattern, scale in UNIT_SCALES:
+        if re.search(pattern, unit):
+            return scale
+    return 1.0
+
+def split_entry(entry):
+    """
+    Split an extracted entry into its label and raw value tokens
+
+    Args:
+        entry: String such as "Caixa: 1.234, (567)" or "Caixa: [1234, 567]"
+    Returns:
+        Tuple (label, list of value tokens). Values are empty when the entry has no ":".
+    """
+    label, separator, values = entry.strip().strip("'\"").rpartition(":")
+    if not separator:
+        return entry.strip(), []
+    values = values.strip()
+    if values.startswith("[") and values.endswith("]"):
+        values = values[1:-1]
+        # A bracketed list with no spaces, "[1234,567]", is separated by bare commas
+        if "," in values and not re.search(r",\s|;", values):
+            values = values.replace(",", ", ")
+    tokens = [token.strip().strip("'\"") for token in _VALUE_SEPARATOR.split(values)]
+    return label.strip(), [token for token in tokens if token]
+
+def _normalize_amounts(tokens):
+    """Strip signs, currency and thousands separators. Returns (normalized strings, negative mask, nil mask)."""
+    text = tokens.astype(str).str.strip().str.replace(r"^R\$\s*|\s+", "", regex=True)
+    negative = text.str.match(r"^\(.*\)$|^[-–−]\d")
+    digits = text.str.replace(r"^[(\-–−]+|\)$", "", regex=True)
+
+    has_comma = digits.str.contains(",", regex=False)
+    thousands_only = digits.str.match(_THOUSANDS_ONLY)
+    # With a decimal comma every dot is a thousands separator; without one, dots are thousands
+    # separators only when they split groups of three digits (1.234 but not 0.25)
+    normalized = digits.where(~(has_comma | thousands_only), digits.str.replace(".", "", regex=False))
+    normalized = normalized.str.replace(",", ".", regex=False)
+    nil = text.isin(["-", "–", "—"])
+    return normalized, negative, nil
+
+def parse_amounts(tokens):
+    """
+    Convert Brazilian formatted amounts to floats
+
+    Handles thousands dots (1.234.567), decimal commas (0,2115), parentheses and minus
+    negatives ((1.234), -1.234) and "-" for nil balances, which becomes 0.
+    Args:
+        tokens: pd.Series of strings
+    Returns:
+        pd.Series of float64, NaN where a token is not an amount
+    """
+    normalized, negative, nil = _normalize_amounts(tokens)
+    amounts = pd.to_numeric(normalized, errors="coerce")
+    amounts = amounts.where(~negative, -amounts)
+    return amounts.mask(nil, 0.0).astype("float64")
+
+def _to_decimal(text):
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        return None
+    return value if value.is_finite() else None
+
+def parse_decimals(tokens):
+    """Same as parse_amounts, but exact: returns a pd.Series of Decimal (None where a token is not an amount)."""
+    normalized, negative, nil = _normalize_amounts(tokens)
+    decimals = [
+        Decimal(0) if is_nil else (None if value is None else (-value if is_negative else value))
+        for value, is_negative, is_nil in zip(map(_to_decimal, normalized), negative, nil)
+    ]
+    return pd.Series(decimals, index=tokens.index, dtype="object")
+
+def hierarchy_levels(labels, has_values):
+    """
+    Hierarchy level of each line item of a section
+
+    0 for totals, 1 for line items and headers, 2 for the items listed under a header
+    (an entry with no values, e.g. "Receitas (despesas) operacionais") until the next total.
+    """
+    levels, under_header = [], False
+    for label, valued in zip(labels, has_values):
+        if _TOTAL.match(normalize(label)):
+            levels.append(0)
+            under_header = False
+        elif not valued:
+            levels.append(1)
+            under_header = True
+        else:
+            levels.append(2 if under_header else 1)
+    return levels
+
+def _column_names(datas, num_periods):
+    names = [str(date).strip() for date in datas[:num_periods]]
+    names += [f"periodo_{i + 1}" for i in range(len(names), num_periods)]
+    # Repeated dates would collide as columns
+    seen = {}
+    for i, name in enumerate(names):
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            names[i] = f"{name}_{seen[name]}"
+    return names
+
+# --- DataFrame --- #
+def _as_dict(document):
+    return document.model_dump() if hasattr(document, "model_dump") else dict(document)
+
+def _parse_entries(data):
+    """Split every section entry. Returns (one row per line item, one row per value token)."""
+    rows, tokens = [], []
+    for section in SECTIONS:
+        for entry in data.get(section) or []:
+            label, values = split_entry(str(entry))
+            rows.append((section, label, str(entry)))
+            tokens.extend((len(rows) - 1, period, value) for period, value in enumerate(values))
+    items = pd.DataFrame(rows, columns=["secao", "descricao", "entrada"])
+    values = pd.DataFrame(tokens, columns=["linha", "periodo", "token"])
+    return items, values
+
+def build_dataframe(document, scale_units=True):
+    """
+    Build a multi-period DataFrame from a field extraction result
+
+    Args:
+        document: DocumentStructure, or its dict
+        scale_units: Multiply the amounts by the scale of `unidade_monetaria` (Milhares de R$ -> 1000),
+            except for per share items
+    Returns:
+        pd.DataFrame with one row per line item: "secao", "descricao" and one float column per
+        date in `datas`. `df.attrs` holds the company, the unit, the scale applied and the
+        entries whose values could not be parsed.
+    """
+    data = _as_dict(document)
+    items, values = _parse_entries(data)
+    values["valor"] = parse_amounts(values["token"]) if len(values) else pd.Series(dtype="float64")
+
+    num_periods = max(len(data.get("datas") or []), int(values["periodo"].max()) + 1 if len(values) else 0)
+    wide = (
+        values.pivot(index="linha", columns="periodo", values="valor")
+        .reindex(index=range(len(items)), columns=range(num_periods))
+        .astype("float64")
+    )
+
+    scale = unit_scale(data.get("unidade_monetaria")) if scale_units else 1.0
+    if scale != 1.0:
+        unscaled = items["descricao"].map(normalize).str.contains(UNSCALED_ITEMS).to_numpy()
+        wide = wide.mul(np.where(unscaled, 1.0, scale), axis=0)
+
+    wide.columns = _column_names(data.get("datas") or [], num_periods)
+    df = pd.concat([items[["secao", "descricao"]], wide.reset_index(drop=True)], axis=1)
+
+    unparsed = values.loc[values["valor"].isna(), "linha"].unique()
+    df.attrs.update({
+        "empresa": data.get("empresa"),
+        "unidade_monetaria": data.get("unidade_monetaria"),
+        "escala": scale,
+        "nao_convertidos": items.loc[unparsed, "entrada"].tolist(),
+    })
+    return df
+
+# --- Typed line items --- #
+def build_statement(document, documento=None, scale_units=True):
+    """
+    Convert a field extraction result into typed line items, one per line item and period
+
+    Args:
+        document: DocumentStructure, or its dict
+        documento: Source document (PDF path or id) recorded with the statement
+        scale_units: Multiply the values by the scale of `unidade_monetaria`, except for per share items
+    Returns:
+        FinancialStatement whose values are exact Decimals. Headers (entries with no values) have
+        one line item per period with valor None, as do values that could not be parsed.
+    """
+    data = _as_dict(document)
+    items, values = _parse_entries(data)
+    datas = [str(date).strip() for date in data.get("datas") or []]
+    scale = unit_scale(data.get("unidade_monetaria")) if scale_units else 1.0
+
+    items["nivel"] = 0
+    for _, group in items.groupby("secao", sort=False):
+        items.loc[group.index, "nivel"] = hierarchy_levels(group["descricao"], group.index.isin(values["linha"]))
+    items["ordem"] = items.groupby("secao", sort=False).cumcount()
+    unscaled = items["descricao"].map(normalize).str.contains(UNSCALED_ITEMS).to_numpy(dtype=bool)
+    items["escala"] = np.where(unscaled, 1, int(scale))
+
+    decimals = parse_decimals(values["token"]) if len(values) else []
+    line_values = {}
+    for linha, periodo, valor in zip(values["linha"], values["periodo"], decimals):
+        line_values.setdefault(linha, []).append((periodo, valor))
+    # Headers have no values: they are emitted for every period with valor=None, so that the
+    # statement keeps its structure
+    header_values = [(periodo, None) for periodo in range(max(len(datas), 1))]
+
+    line_items = []
+    for linha, item in items.iterrows():
+        for periodo, valor in line_values.get(linha, header_values):
+            line_items.append(LineItem(
+                secao=item["secao"],
+                descricao=item["descricao"],
+                nivel=int(item["nivel"]),
+                ordem=int(item["ordem"]),
+                periodo=datas[periodo] if periodo < len(datas) else f"periodo_{periodo + 1}",
+                valor=None if valor is None else valor * int(item["escala"]),
+                escala=int(item["escala"]),
+            ))
+
+    return FinancialStatement(
+        documento=None if documento is None else str(documento),
+        empresa=data.get("empresa") or "",
+        unidade_monetaria=data.get("unidade_monetaria") or "",
+        escala=int(scale),
+        datas=datas,
+        itens=line_items,
+    )
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
+from decimal import Decimal
 
 class DocumentStructure(BaseModel):
     empresa: str
@@ -10,4 +11,30 @@ class DocumentStructure(BaseModel):
     passivo_nao_circulante: List[str]
     patrimonio_liquido: List[str]
     demonstracao_do_resultado: List[str]
-    datas: List[str]
\ No newline at end of file
+    datas: List[str]
+
+# Result of one section agent (refer to agents/section_agents.py), merged into DocumentStructure
+class SectionExtraction(BaseModel):
+    empresa: str
+    unidade_monetaria: str
+    itens: List[str] = Field(description="[NOME DO CAMPO]: [VALOR_1], [VALOR_2]")
+    datas: List[str]
+
+# --- Typed output --- #
+# One row per line item and period, built from DocumentStructure by structured_output/dataframe_builder.py
+class LineItem(BaseModel):
+    secao: str = Field(description="DocumentStructure section, e.g. ativo_circulante")
+    descricao: str
+    nivel: int = Field(description="0 for totals, 1 for line items and headers, 2 for items under a header")
+    ordem: int = Field(description="Position of the line item in its section")
+    periodo: str = Field(description="Date of the column, as found in `datas`")
+    valor: Optional[Decimal] = Field(description="Value in R$, already multiplied by `escala`. None for headers and unparsed values")
+    escala: int = Field(description="Multiplier applied to the printed value (1000 for Milhares de R$)")
+
+class FinancialStatement(BaseModel):
+    documento: Optional[str] = None
+    empresa: str
+    unidade_monetaria: str
+    escala: int
+    datas: List[str]
+    itens: List[LineItem]
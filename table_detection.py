@@ -1,105 +1,273 @@
-import pytesseract
-from PIL import Image
+import os
+from types import SimpleNamespace
+from pathlib import Path
+
 import numpy as np
-from transformers import DetrImageProcessor, TableTransformerForObjectDetection
-import torch
-import matplotlib.pyplot as plt
 
-def detect_tables_with_transformer(image_path):
+from box_postprocessing import filter_detections
+from lazy_imports import LazyModule
+from tracing.stage_tracing import stage
+
+# torch and transformers are only imported when a detector is loaded, matplotlib when a result is plotted
+torch = LazyModule("torch")
+transformers = LazyModule("transformers")
+plt = LazyModule("matplotlib.pyplot")
+pytesseract = LazyModule("pytesseract")
+Image = LazyModule("PIL.Image")
+# ONNX Runtime is only needed by the "onnx" and "onnx_int8" backends
+ort = LazyModule("onnxruntime")
+
+MODEL_NAME = "apkonsta/table-transformer-detection-ifrs"
+
+# Inference backends of TableDetector:
+#   torch:     fp32 PyTorch, on GPU when available
+#   int8:      PyTorch on CPU, with the Linear layers of the transformer dynamically quantized to INT8
+#   onnx:      ONNX export of the model, run by ONNX Runtime on CPU
+#   onnx_int8: the ONNX export with its weights dynamically quantized to INT8
+BACKENDS = ("torch", "int8", "onnx", "onnx_int8")
+# ONNX exports are written once per model and reused by every process
+ONNX_DIR = os.getenv("TABLE_DETECTOR_ONNX_DIR", ".cache/models")
+
+def load_image(image):
+    """
+    Load an image as RGB
+
+    Args:
+        image: Path to the image file, PIL Image object or HxW(xC) numpy array
+    Returns:
+        PIL Image object in RGB mode
+    """
+    if isinstance(image, str):
+        image = Image.open(image)
+    elif isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+
+    # Convert image to RGB if it's not
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return image
+
+# --- CPU inference --- #
+def onnx_model_path(model_name=MODEL_NAME, quantized=False):
+    """Path of the ONNX export of a model, under ONNX_DIR."""
+    suffix = ".int8.onnx" if quantized else ".onnx"
+    return Path(ONNX_DIR) / (model_name.replace("/", "__") + suffix)
+
+def export_onnx(model, path, image_size=1024):
+    """
+    Export a TableTransformerForObjectDetection model to ONNX
+
+    Batch size and image size are dynamic axes, as the processor pads each batch to its largest page.
+    """
+    class _Outputs(torch.nn.Module):
+        # ONNX graphs return tuples, not the model's output dataclass
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values, pixel_mask):
+            outputs = self.model(pixel_values=pixel_values, pixel_mask=pixel_mask)
+            return outputs.logits, outputs.pred_boxes
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pixel_values = torch.zeros(1, 3, image_size, image_size)
+    pixel_mask = torch.ones(1, image_size, image_size, dtype=torch.long)
+    # no_grad rather than inference_mode: inference tensors can break tracing on some torch versions
+    with torch.no_grad():
+        torch.onnx.export(
+            _Outputs(model.eval()), (pixel_values, pixel_mask), str(path),
+            input_names=["pixel_values", "pixel_mask"],
+            output_names=["logits", "pred_boxes"],
+            dynamic_axes={
+                "pixel_values": {0: "batch", 2: "height", 3: "width"},
+                "pixel_mask": {0: "batch", 1: "height", 2: "width"},
+                "logits": {0: "batch"},
+                "pred_boxes": {0: "batch"},
+            },
+            opset_version=17,
+        )
+    return path
+
+def quantize_onnx(path, quantized_path):
+    """Write a copy of an ONNX model with its weights dynamically quantized to INT8."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(str(path), str(quantized_path), weight_type=QuantType.QInt8)
+    return Path(quantized_path)
+
+class OnnxDetectionModel:
+    """
+    ONNX Runtime session standing in for the PyTorch model in TableDetector.detect
+
+    Takes the processor's tensors and returns the logits and boxes as tensors, so the
+    processor's post-processing is the same for every backend.
+    """
+
+    def __init__(self, path, num_threads=None):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # 0 lets ONNX Runtime use one thread per physical core
+        options.intra_op_num_threads = num_threads or 0
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, pixel_values, pixel_mask):
+        logits, pred_boxes = self.session.run(None, {
+            "pixel_values": pixel_values.cpu().numpy(),
+            "pixel_mask": pixel_mask.cpu().numpy().astype(np.int64),
+        })
+        return SimpleNamespace(logits=torch.from_numpy(logits), pred_boxes=torch.from_numpy(pred_boxes))
+
+# --- Detector --- #
+class TableDetector:
+    """
+    Reusable Table Transformer (IFRS model) detector
+
+    The processor and the model are loaded lazily, on the first detection, and kept
+    for every following call, so a whole document pays for a single model load.
+    Pages are run through the model in batches.
+    """
+
+    def __init__(self, model_name=MODEL_NAME, batch_size=4, threshold=0.1, iou_threshold=0.45, device=None,
+                 backend="torch", num_threads=None):
+        """
+        Args:
+            model_name: Hugging Face model id
+            batch_size: Number of pages per forward pass
+            threshold: Minimum detection confidence
+            iou_threshold: IoU above which overlapping detections are suppressed
+            device: Torch device. Defaults to GPU if available, else CPU. The CPU backends always run on CPU
+            backend: Inference backend, one of BACKENDS
+            num_threads: CPU threads of the forward pass. Defaults to the backend's own default
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}'. Available backends: {', '.join(BACKENDS)}.")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.threshold = threshold
+        self.iou_threshold = iou_threshold
+        self.backend = backend
+        self.num_threads = num_threads
+        if backend == "torch":
+            self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        else:
+            self.device = "cpu"
+        self._processor = None
+        self._model = None
+
+    def load(self):
+        """Load the processor and the model, if not loaded yet."""
+        if self._model is None:
+            with stage("model_load", model=self.model_name, device=self.device, backend=self.backend):
+                self._processor = transformers.DetrImageProcessor.from_pretrained(
+                    self.model_name,
+                    max_size=1600,  # Limit maximum size while keeping aspect ratio
+                    do_resize=True,
+                    size={'height': 1024, 'width': 1024},  # More balanced size
+                )
+                self._model = self._load_model()
+        return self
+
+    def _load_model(self):
+        if self.backend in ("onnx", "onnx_int8"):
+            path = onnx_model_path(self.model_name, quantized=self.backend == "onnx_int8")
+            if not path.exists():
+                fp32_path = onnx_model_path(self.model_name)
+                if not fp32_path.exists():
+                    export_onnx(transformers.TableTransformerForObjectDetection.from_pretrained(self.model_name), fp32_path)
+                if self.backend == "onnx_int8":
+                    quantize_onnx(fp32_path, path)
+            return OnnxDetectionModel(path, self.num_threads)
+
+        if self.num_threads:
+            # Process-wide setting of PyTorch's intra-op thread pool
+            torch.set_num_threads(self.num_threads)
+        model = transformers.TableTransformerForObjectDetection.from_pretrained(self.model_name).eval()
+        if self.backend == "int8":
+            # The transformer's Linear layers dominate the CPU time; the convolutional backbone stays fp32
+            return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model.to(self.device)
+
+    @property
+    def processor(self):
+        return self.load()._processor
+
+    @property
+    def model(self):
+        return self.load()._model
+
+    def detect(self, images, threshold=None, iou_threshold=None):
+        """
+        Detect tables in a list of page images
+
+        Args:
+            images: List of image paths, PIL Image objects or numpy arrays
+            threshold: Overrides the detector's minimum confidence for this call
+            iou_threshold: Overrides the detector's NMS IoU threshold for this call
+        Returns:
+            List with one results dict ("scores", "labels", "boxes") per image, in input order
+        """
+        threshold = self.threshold if threshold is None else threshold
+        iou_threshold = self.iou_threshold if iou_threshold is None else iou_threshold
+        images = [load_image(image) for image in images]
+        results = []
+
+        for start in range(0, len(images), self.batch_size):
+            batch = images[start:start + self.batch_size]
+
+            # Images of different sizes are padded to a common size by the processor
+            inputs = self.processor(images=batch, return_tensors="pt")
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+
+            with stage("inference", pages=len(batch), device=self.device, backend=self.backend), torch.inference_mode():
+                outputs = self.model(**inputs)
+
+            # Convert outputs to XYXY format in each page's own coordinates
+            target_sizes = torch.tensor([image.size[::-1] for image in batch]).to(self.device)
+            batch_results = self.processor.post_process_object_detection(
+                outputs,
+                threshold=threshold,
+                target_sizes=target_sizes
+            )
+            results.extend(batch_results)
+
+        # Filter overlapping boxes of all pages in one batched pass
+        return filter_detections(results, score_threshold=threshold, iou_threshold=iou_threshold)
+
+_default_detector = None
+
+def get_detector():
+    """
+    Return the process-wide TableDetector, creating it on first use
+
+    The backend and its CPU threads are read from TABLE_DETECTOR_BACKEND (one of BACKENDS,
+    default "torch") and TABLE_DETECTOR_THREADS.
+    """
+    global _default_detector
+    if _default_detector is None:
+        _default_detector = TableDetector(
+            backend=os.getenv("TABLE_DETECTOR_BACKEND", "torch"),
+            num_threads=int(os.getenv("TABLE_DETECTOR_THREADS", 0)) or None,
+        )
+    return _default_detector
+
+def detect_tables_with_transformer(image_path, threshold=0.1, iou_threshold=0.45):
     """
     Detect tables in an image using Table Transformer (IFRS model)
     
     Args:
         image_path: Path to the image file or PIL Image object
+        threshold: Minimum detection confidence
+        iou_threshold: IoU above which overlapping detections are suppressed
     Returns:
         List of detected table coordinates
     """
-    MODEL_NAME = "apkonsta/table-transformer-detection-ifrs"
-    
-    # Load the model and processor
-    processor = DetrImageProcessor.from_pretrained(
-        MODEL_NAME,
-        max_size=1600,  # Limit maximum size while keeping aspect ratio
-        do_resize=True,
-        size={'height': 1024, 'width': 1024},  # More balanced size
-    )
-    model = TableTransformerForObjectDetection.from_pretrained(MODEL_NAME)
-    
-    # Move model to GPU if available
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"Using device: {device}")
-    model = model.to(device)
-    
-    # Load and process the image
-    if isinstance(image_path, str):
-        image = Image.open(image_path)
-    else:
-        image = image_path
-    
+    image = load_image(image_path)
     print(f"Original image size: {image.size}")
-    
-    # Convert image to RGB if it's not
-    if image.mode != 'RGB':
-        print(f"Converting image from {image.mode} to RGB")
-        image = image.convert('RGB')
-    
-    # Process image
-    inputs = processor(images=image, return_tensors="pt")
-    inputs = {k: v.to(device) for k, v in inputs.items()}
-    
-    # Get predictions
-    with torch.no_grad():  # Disable gradient computation
-        outputs = model(**inputs)
-    
-    # Convert outputs to XYXY format with adjusted parameters
-    target_sizes = torch.tensor([image.size[::-1]]).to(device)
-    results = processor.post_process_object_detection(
-        outputs, 
-        threshold=0.1,  # Lower confidence threshold
-        target_sizes=target_sizes
-    )[0]
-    
-    # Filter overlapping boxes
-    boxes = results["boxes"]
-    scores = results["scores"]
-    
-    # Convert to numpy for easier manipulation
-    boxes_np = boxes.cpu().detach().numpy()
-    scores_np = scores.cpu().detach().numpy()
-    
-    # Calculate areas
-    areas = (boxes_np[:, 2] - boxes_np[:, 0]) * (boxes_np[:, 3] - boxes_np[:, 1])
-    
-    # Sort by confidence
-    order = scores_np.argsort()[::-1]
-    keep = []
-    
-    while order.size > 0:
-        i = order[0]
-        keep.append(i)
-        
-        if order.size == 1:
-            break
-            
-        # Calculate IoU with rest of boxes
-        xx1 = np.maximum(boxes_np[i, 0], boxes_np[order[1:], 0])
-        yy1 = np.maximum(boxes_np[i, 1], boxes_np[order[1:], 1])
-        xx2 = np.minimum(boxes_np[i, 2], boxes_np[order[1:], 2])
-        yy2 = np.minimum(boxes_np[i, 3], boxes_np[order[1:], 3])
-        
-        w = np.maximum(0.0, xx2 - xx1)
-        h = np.maximum(0.0, yy2 - yy1)
-        inter = w * h
-        
-        ovr = inter / (areas[i] + areas[order[1:]] - inter)
-        
-        # Get indices of boxes with lower IoU than threshold
-        inds = np.where(ovr <= 0.45)[0]
-        order = order[inds + 1]
-    
-    # Update results with filtered boxes
-    results["boxes"] = boxes[keep]
-    results["scores"] = scores[keep]
+
+    detector = get_detector()
+    print(f"Using device: {detector.device}")
+    results = detector.detect([image], threshold=threshold, iou_threshold=iou_threshold)[0]
     
     print(f"\nNumber of detected tables: {len(results['scores'])}")
     for i, (score, box) in enumerate(zip(results["scores"], results["boxes"]), 1):
@@ -113,14 +281,19 @@ def extract_table_with_tesseract(image, coords=None):
     Extract table content using Tesseract OCR
     
     Args:
-        image: PIL Image object
+        image: PIL Image object or (height, width, channels) numpy array
         coords: Optional coordinates to crop the image to specific table region
     Returns:
         Extracted text
     """
     if coords:
         # Crop image to table coordinates if provided
-        image = image.crop(coords)
+        if isinstance(image, np.ndarray):
+            # Slicing gives a view of the page bitmap instead of a copy
+            x1, y1, x2, y2 = (int(round(c)) for c in coords)
+            image = image[max(y1, 0):y2, max(x1, 0):x2]
+        else:
+            image = image.crop(coords)
     
     # Configure Tesseract to look for tables
     custom_config = r'--oem 3 --psm 6 -c preserve_interword_spaces=1'
@@ -155,17 +328,19 @@ def visualize_detection(image, results):
     plt.axis('off')
     plt.show()
 
-def process_document_with_tables(image_path):
+def process_document_with_tables(image_path, threshold=0.1, iou_threshold=0.45):
     """
     Main function to process a document and extract tables
     
     Args:
         image_path: Path to the image file or PIL Image object
+        threshold: Minimum detection confidence
+        iou_threshold: IoU above which overlapping detections are suppressed
     """
     print("Starting IFRS table detection...")
     
     # Detect tables
-    results = detect_tables_with_transformer(image_path)
+    results = detect_tables_with_transformer(image_path, threshold, iou_threshold)
     
     # Load image if path provided
     if isinstance(image_path, str):
@@ -183,7 +358,7 @@ def process_document_with_tables(image_path):
     # Extract text from each detected table
     tables = []
     for i, (score, box) in enumerate(zip(results["scores"].cpu(), results["boxes"].cpu()), 1):
-        if score > 0.1:  # Lower confidence threshold
+        if score > threshold:
             coords = box.detach().numpy().tolist()
             table_text = extract_table_with_tesseract(image, coords)
             tables.append({
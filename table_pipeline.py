@@ -0,0 +1,200 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from lazy_imports import LazyModule
+from table_detection import get_detector, extract_table_with_tesseract
+from table_structure import recognize_table, grid_text
+from pdf_parsing.render_planner import plan_page, fixed_plan, render_clip
+
+fitz = LazyModule("fitz")
+
+# Sentinel put on the queue by the renderer once every page was rendered
+_DONE = object()
+# PyMuPDF is not thread-safe: the page renderer and the table clip renders take turns
+_FITZ_LOCK = threading.Lock()
+
+def render_page_array(page, dpi=300):
+    """
+    Rasterize a PyMuPDF page into an RGB numpy array
+
+    Args:
+        page: fitz.Page object
+        dpi: Render resolution
+    Returns:
+        (height, width, 3) uint8 array
+    """
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+
+def _put(pages_queue, item, stop):
+    """Put an item on the queue, giving up if the consumer stopped."""
+    # Blocks while the queue is full, which bounds how many bitmaps are alive
+    while not stop.is_set():
+        try:
+            pages_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _render_page(pdf_document, page_number, dpi):
+    """Plans the resolutions of a page (fixed when `dpi` is given) and renders it for detection."""
+    with _FITZ_LOCK:
+        page = pdf_document.load_page(page_number)
+        plan = fixed_plan(page, dpi) if dpi else plan_page(page)
+        return render_page_array(page, plan.detection_dpi), plan
+
+def _render_pages(pdf_path, page_numbers, dpi, pages_queue, stop):
+    """
+    Producer: render each page once and hand it to the consumer through a bounded queue
+
+    Runs in its own thread, with its own fitz document.
+    """
+    try:
+        with fitz.open(pdf_path) as pdf_document:
+            if page_numbers is None:
+                page_numbers = range(pdf_document.page_count)
+
+            for page_number in page_numbers:
+                image, plan = _render_page(pdf_document, page_number, dpi)
+                if not _put(pages_queue, (page_number, image, plan), stop):
+                    return
+    except Exception as e:
+        _put(pages_queue, e, stop)
+        return
+    _put(pages_queue, _DONE, stop)
+
+def _crop(image, coords):
+    """View of the page bitmap inside a detection box, in pixels."""
+    x1, y1, x2, y2 = (int(round(c)) for c in coords)
+    return image[max(y1, 0):y2, max(x1, 0):x2]
+
+def _table_crops(image, boxes, bboxes, plan, clip_document):
+    """
+    Images of the detected tables for OCR
+
+    When OCR is planned at a higher resolution than detection, only the table regions are
+    re-rendered at that resolution (fitz clip); otherwise they are cropped from the page bitmap.
+    """
+    if clip_document is None or plan.ocr_dpi == plan.detection_dpi:
+        return [_crop(image, coords) for coords in boxes]
+    with _FITZ_LOCK:
+        page = clip_document.load_page(plan.page_number)
+        return [render_clip(page, bbox, plan.ocr_dpi) for bbox in bboxes]
+
+def _ocr_tables(image, results, plan, executor, structure=True, clip_document=None):
+    """
+    Crop every detected table and OCR it
+
+    With `structure`, each table is OCRed once with image_to_data and its words placed in the
+    rows and columns found by table_structure: 'cells' holds the grid and 'content' its compact
+    'cell|cell' text. Otherwise 'content' is the flat text of the whole crop.
+    """
+    scale = 72 / plan.detection_dpi # pixels -> PDF points
+    boxes = [box.tolist() for box in results["boxes"].cpu()]
+    bboxes = [[c * scale for c in coords] for coords in boxes]
+    crops = _table_crops(image, boxes, bboxes, plan, clip_document)
+    if structure:
+        grids = list(executor.map(recognize_table, crops))
+        contents = [grid_text(cells) for cells in grids]
+    else:
+        grids = [None] * len(boxes)
+        contents = executor.map(extract_table_with_tesseract, crops)
+
+    return [
+        {
+            'table_number': i,
+            'confidence': score.item(),
+            'coordinates': coords,
+            'bbox': bbox,
+            'content': content,
+            'cells': cells,
+        }
+        for i, (score, coords, bbox, content, cells) in enumerate(
+            zip(results["scores"].cpu(), boxes, bboxes, contents, grids), 1
+        )
+    ]
+
+def iter_document_tables(pdf_path, pages=None, dpi=300, detector=None, prefetch=4, ocr_workers=4,
+                         threshold=None, iou_threshold=None, structure=True):
+    """
+    Detect and OCR the tables of a PDF, rendering every page exactly once for detection
+
+    Pages are rasterized by a producer thread into numpy arrays and passed through a
+    bounded queue, and released as soon as their page is yielded. With `dpi=None`, each page
+    is rendered at the lowest resolution the detector needs and only its tables are re-rendered
+    at the resolution planned for OCR (refer to pdf_parsing/render_planner.py).
+
+    Args:
+        pdf_path: Path to the PDF file
+        pages: Optional list of page numbers (0-based). Defaults to all pages
+        dpi: Fixed render resolution, shared by detection and OCR crops of the same bitmap.
+            None opts in to planning the resolutions of each page; it stays opt-in until its
+            detection and OCR accuracy are measured (benchmarks/bench_table_detector.py --planned)
+        detector: TableDetector to use. Defaults to the process-wide detector
+        prefetch: Maximum number of rendered pages waiting in the queue
+        ocr_workers: Number of Tesseract processes running at once
+        threshold: Minimum detection confidence (defaults to the detector's)
+        iou_threshold: NMS IoU threshold (defaults to the detector's)
+        structure: Recognize the rows and columns of each table (refer to table_structure).
+            False keeps the flat Tesseract text of the whole crop
+    Returns:
+        Generator of dicts with 'page_number', 'size', 'dpi', 'ocr_dpi' and 'tables' for each page
+    """
+    detector = detector or get_detector()
+    # Table regions are re-rendered from a second handle on the document, opened only when needed
+    clip_document = None if dpi else fitz.open(pdf_path)
+    pages_queue = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    renderer = threading.Thread(
+        target=_render_pages, args=(pdf_path, pages, dpi, pages_queue, stop), daemon=True
+    )
+    renderer.start()
+
+    def process(batch):
+        results = detector.detect([image for _, image, _ in batch], threshold=threshold, iou_threshold=iou_threshold)
+        for (page_number, image, plan), page_results in zip(batch, results):
+            yield {
+                'page_number': page_number,
+                'size': (image.shape[1], image.shape[0]),
+                'dpi': plan.detection_dpi,
+                'ocr_dpi': plan.ocr_dpi,
+                'tables': _ocr_tables(image, page_results, plan, executor, structure, clip_document),
+            }
+
+    try:
+        # Tesseract runs as a subprocess, so threads are enough to OCR crops in parallel
+        with ThreadPoolExecutor(max_workers=ocr_workers) as executor:
+            batch = []
+            while True:
+                item = pages_queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                batch.append(item)
+                if len(batch) == detector.batch_size:
+                    yield from process(batch)
+                    batch = []
+            if batch:
+                yield from process(batch)
+    finally:
+        stop.set()
+        renderer.join()
+        if clip_document is not None:
+            clip_document.close()
+
+def extract_document_tables(pdf_path, **kwargs):
+    """Same as iter_document_tables, returning a list with the results of every page."""
+    return list(iter_document_tables(pdf_path, **kwargs))
+
+if __name__ == "__main__":
+    # Example usage
+    pdf_path = "data/atradius.pdf"
+    for page in iter_document_tables(pdf_path):
+        for table in page['tables']:
+            print(f"\nPage {page['page_number']}, table {table['table_number']} (confidence: {table['confidence']:.2f}):")
+            print(table['content'])
@@ -0,0 +1,171 @@
+import numpy as np
+
+from lazy_imports import LazyModule
+from pdf_parsing.layout import SEPARATOR
+
+pytesseract = LazyModule("pytesseract")
+
+# Same Tesseract settings as extract_table_with_tesseract, but run once per table through image_to_data
+TESSERACT_CONFIG = r'--oem 3 --psm 6 -c preserve_interword_spaces=1'
+# Words recognized below this confidence (0-100) are dropped
+MIN_WORD_CONFIDENCE = 0
+# Highest gray level (0-255) counted as ink. Otsu's threshold is capped at it, so that the light
+# shading of alternate rows or of a header band is background, not ink
+MAX_INK_THRESHOLD = 160
+# A horizontal (vertical) run of ink covering this share of the crop's width (height) is a ruling line
+RULING_SHARE = 0.6
+# Pixel rows with less ink than this share of the median ink of a text pixel row separate two rows
+ROW_GAP_INK = 0.1
+# Bands thinner than this share of the median row height are not rows
+MIN_ROW_HEIGHT = 0.4
+# Columns are separated by x ranges with ink on at most this share of the rows (a title or
+# a header spanning several columns does not hide the gap between them)
+COLUMN_INK_SHARE = 0.15
+# Minimum width of a gap between two columns, as a multiple of the median row height
+MIN_COLUMN_GAP = 0.4
+
+# --- Image --- #
+def ink_mask(image):
+    """
+    Boolean mask of the dark pixels of a table crop
+
+    Args:
+        image: (height, width) or (height, width, channels) uint8 array
+    Returns:
+        (height, width) bool array, True on ink
+    """
+    gray = image if image.ndim == 2 else image[..., :3].mean(axis=2)
+    histogram = np.bincount(gray.astype(np.uint8).ravel(), minlength=256).astype(float)
+    # Otsu's threshold: the gray level maximizing the between-class variance
+    weights = np.cumsum(histogram)
+    means = np.cumsum(histogram * np.arange(256))
+    total_weight, total_mean = weights[-1], means[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (total_mean * weights - means * total_weight) ** 2 / (weights * (total_weight - weights))
+    variance = np.nan_to_num(variance, nan=0.0, posinf=0.0)
+    threshold = min(int(variance.argmax()), MAX_INK_THRESHOLD) if variance.max() > 0 else MAX_INK_THRESHOLD
+    return gray <= threshold
+
+def _runs(mask):
+    """(start, end) of each run of True values of a 1-D mask, end excluded."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+# --- Structure --- #
+def find_rows(ink):
+    """
+    Row bands of a table from its horizontal projection profile
+
+    Ruling lines are ignored, so ruled and unruled tables give the same rows.
+    Returns:
+        Tuple (row starts, row ends) in pixels, ends excluded
+    """
+    ruling = ink.mean(axis=1) >= RULING_SHARE
+    # Vertical ruling lines would join every row band into one
+    text_ink = ink[:, ink.mean(axis=0) < RULING_SHARE]
+    # Descenders and accents of tightly set lines touch the next line: a pixel row with very
+    # little ink compared to a line of text still separates two rows
+    profile = text_ink.sum(axis=1)
+    min_ink = ROW_GAP_INK * np.median(profile[profile > 0]) if profile.any() else 0
+    has_text = (profile > min_ink) & ~ruling
+    starts, ends = _runs(has_text)
+    # Bands much thinner than a line of text are underlines (below totals) or specks, not rows
+    heights = ends - starts
+    keep = heights >= MIN_ROW_HEIGHT * np.median(heights) if len(heights) else heights.astype(bool)
+    return starts[keep], ends[keep]
+
+def find_columns(ink, row_starts, row_ends):
+    """
+    Column boundaries of a table from the vertical projection profile of its rows
+
+    The profile counts, for each x, the rows with ink at that x. Columns are split at gaps at
+    least MIN_COLUMN_GAP row heights wide, so the spaces between the words of a label do not
+    split it, and at vertical ruling lines.
+    Returns:
+        Array of x positions separating consecutive columns
+    """
+    if not len(row_starts):
+        return np.zeros(0)
+    # Ink of each row band at each x, in a single reduction: reduceat over [start, end) pairs,
+    # with a blank line appended so that a band ending on the last pixel row has a valid end index
+    padded = np.vstack([ink, np.zeros((1, ink.shape[1]), dtype=bool)])
+    row_ink = np.logical_or.reduceat(padded, np.column_stack([row_starts, row_ends]).ravel(), axis=0)[::2]
+
+    ruling = ink.mean(axis=0) >= RULING_SHARE
+    share = row_ink.sum(axis=0) / len(row_starts)
+    starts, ends = _runs((share <= COLUMN_INK_SHARE) | ruling)
+
+    # Gaps holding a vertical ruling line split columns whatever their width
+    ruling_count = np.concatenate([[0], np.cumsum(ruling)])
+    has_ruling = ruling_count[ends] - ruling_count[starts] > 0
+    min_gap = MIN_COLUMN_GAP * np.median(row_ends - row_starts)
+    # Only gaps between text count: the margins of the crop are not column boundaries
+    inner = (starts > 0) & (ends < ink.shape[1]) & ((ends - starts >= min_gap) | has_ruling)
+    return (starts[inner] + ends[inner]) / 2
+
+# --- OCR --- #
+def ocr_words(image):
+    """
+    Words of a table crop from a single Tesseract image_to_data call
+
+    Returns:
+        Tuple (texts, x0, y0, x1, y1) of arrays, in crop pixels
+    """
+    data = pytesseract.image_to_data(image, config=TESSERACT_CONFIG, output_type=pytesseract.Output.DICT)
+    texts = np.array([text.strip() for text in data["text"]], dtype=object)
+    conf = np.array(data["conf"], dtype=float)
+    keep = (texts != "") & (conf >= MIN_WORD_CONFIDENCE)
+    left, top = np.array(data["left"], dtype=float)[keep], np.array(data["top"], dtype=float)[keep]
+    width, height = np.array(data["width"], dtype=float)[keep], np.array(data["height"], dtype=float)[keep]
+    return texts[keep], left, top, left + width, top + height
+
+def assign_words(texts, x0, y0, x1, y1, row_starts, row_ends, column_edges):
+    """
+    Place words in the cells of the grid with vectorized box math
+
+    Each word goes to the row band and the column holding its center. Words of the same cell
+    are joined left to right; a word centered between two row bands goes to the nearest one.
+    Returns:
+        List of rows, each a list of cell strings, one per column
+    """
+    n_rows, n_columns = len(row_starts), len(column_edges) + 1
+    if not n_rows or not len(texts):
+        return []
+    center_x, center_y = (x0 + x1) / 2, (y0 + y1) / 2
+    band_centers = (row_starts + row_ends) / 2
+    rows = np.abs(center_y[:, None] - band_centers[None, :]).argmin(axis=1)
+    columns = np.searchsorted(column_edges, center_x)
+
+    order = np.lexsort((x0, columns, rows))
+    rows, columns, texts = rows[order], columns[order], texts[order]
+    cell_ids = rows * n_columns + columns
+    starts = np.flatnonzero(np.concatenate([[True], cell_ids[1:] != cell_ids[:-1]]))
+    ends = np.append(starts[1:], len(order))
+
+    grid = [[""] * n_columns for _ in range(n_rows)]
+    for start, end in zip(starts, ends):
+        grid[rows[start]][columns[start]] = " ".join(texts[start:end])
+    # Drop rows and columns left empty (ruled gaps, stray specks)
+    grid = [row for row in grid if any(row)]
+    filled = [any(row[column] for row in grid) for column in range(n_columns)]
+    return [[cell for cell, keep in zip(row, filled) if keep] for row in grid]
+
+def recognize_table(image, words=None):
+    """
+    Cell grid of a table crop: rows and columns from projection profiles, text from one OCR pass
+
+    Args:
+        image: (height, width[, channels]) uint8 array of the table crop
+        words: Optional (texts, x0, y0, x1, y1) word arrays, in crop pixels. Defaults to ocr_words(image)
+    Returns:
+        List of rows, each a list of cell strings
+    """
+    ink = ink_mask(image)
+    row_starts, row_ends = find_rows(ink)
+    column_edges = find_columns(ink, row_starts, row_ends)
+    texts, x0, y0, x1, y1 = ocr_words(image) if words is None else words
+    return assign_words(texts, x0, y0, x1, y1, row_starts, row_ends, column_edges)
+
+def grid_text(cells, separator=SEPARATOR):
+    """Compact representation of a cell grid: one 'cell|cell|cell' line per row."""
+    return "\n".join(separator.join(row).rstrip(separator) for row in cells)
@@ -0,0 +1,97 @@
+import unittest
+
+from agents.chunked_extraction import MISSING_VALUE, merge_chunks, reconcile_periods
+from structured_output.dataframe_builder import SECTIONS
+from structured_output.output_classes import DocumentStructure
+
+def chunk(datas, empresa="Vamos Locação", unidade="Milhares de R$", **sections):
+    return DocumentStructure(
+        empresa=empresa,
+        unidade_monetaria=unidade,
+        datas=datas,
+        **{section: sections.get(section, []) for section in SECTIONS},
+    )
+
+class ReconcilePeriodsTest(unittest.TestCase):
+    def test_same_date_in_other_formats_is_one_period(self):
+        datas, positions = reconcile_periods([["31/12/2023", "31/12/2022"], ["31.12.2023", "2022"]])
+        self.assertEqual(datas, ["31/12/2023", "31/12/2022"])
+        self.assertEqual(positions, [[0, 1], [0, 1]])
+
+    def test_full_date_replaces_a_year_alone(self):
+        datas, positions = reconcile_periods([["2023"], ["31/12/2023", "31/12/2022"]])
+        self.assertEqual(datas, ["31/12/2023", "31/12/2022"])
+        self.assertEqual(positions, [[0], [0, 1]])
+
+    def test_conflicting_periods_are_kept_apart_in_order_of_appearance(self):
+        # Same year, different closing dates: a year alone cannot pick one of them
+        datas, positions = reconcile_periods([["31/12/2023", "30/06/2023"], ["2023", "31/12/2022"]])
+        self.assertEqual(datas, ["31/12/2023", "30/06/2023", "2023", "31/12/2022"])
+        self.assertEqual(positions, [[0, 1], [2, 3]])
+
+class MergeChunksTest(unittest.TestCase):
+    def test_overlapping_chunks_keep_statement_order(self):
+        first = chunk(["31/12/2023", "31/12/2022"], ativo_circulante=[
+            "Caixa e equivalentes de caixa: 1.200, 900",
+            "Contas a receber: 800, 750",
+        ])
+        # The next chunk repeats the boundary page, then goes on
+        second = chunk(["31/12/2023", "31/12/2022"], ativo_circulante=[
+            "Contas a receber: 800, 750",
+            "Estoques: 300, 280",
+            "Total do ativo circulante: 2.300, 1.930",
+        ])
+        merged = merge_chunks([first, second])
+        self.assertEqual(merged.ativo_circulante, [
+            "Caixa e equivalentes de caixa: 1.200, 900",
+            "Contas a receber: 800, 750",
+            "Estoques: 300, 280",
+            "Total do ativo circulante: 2.300, 1.930",
+        ])
+
+    def test_item_first_seen_in_a_later_chunk_goes_after_its_predecessor(self):
+        first = chunk(["31/12/2023"], passivo_circulante=["Fornecedores: 500", "Total do passivo circulante: 900"])
+        second = chunk(["31/12/2023"], passivo_circulante=["Fornecedores: 500", "Empréstimos: 400"])
+        merged = merge_chunks([first, second])
+        self.assertEqual(merged.passivo_circulante, [
+            "Fornecedores: 500", "Empréstimos: 400", "Total do passivo circulante: 900",
+        ])
+
+    def test_duplicate_items_are_merged_across_chunks_but_not_within_one(self):
+        first = chunk(["31/12/2023", "31/12/2022"], demonstracao_do_resultado=[
+            "Outras receitas: 10, 8",
+            "Outras receitas: 4, 3",
+        ])
+        second = chunk(["31/12/2023", "31/12/2022"], demonstracao_do_resultado=["Outras receitas: 10, 8"])
+        merged = merge_chunks([first, second])
+        self.assertEqual(merged.demonstracao_do_resultado, ["Outras receitas: 10, 8", "Outras receitas: 4, 3"])
+
+    def test_values_are_reordered_to_the_merged_periods(self):
+        first = chunk(["31/12/2023"], patrimonio_liquido=["Capital social: 1.000"])
+        second = chunk(["31/12/2022", "31/12/2023"], patrimonio_liquido=["Capital social: 950, 1.000"])
+        merged = merge_chunks([first, second])
+        self.assertEqual(merged.datas, ["31/12/2023", "31/12/2022"])
+        self.assertEqual(merged.patrimonio_liquido, ["Capital social: 1.000, 950"])
+
+    def test_period_missing_from_a_chunk_is_marked(self):
+        first = chunk(["31/12/2023", "31/12/2022"], ativo_nao_circulante=["Imobilizado: 5.000, 4.500"])
+        second = chunk(["31/12/2022"], ativo_nao_circulante=["Intangível: 200"])
+        merged = merge_chunks([first, second])
+        self.assertEqual(merged.ativo_nao_circulante, ["Imobilizado: 5.000, 4.500", f"Intangível: {MISSING_VALUE}, 200"])
+
+    def test_values_that_disagree_are_distinct_items(self):
+        first = chunk(["31/12/2023"], ativo_circulante=["Tributos a recuperar: 120"])
+        second = chunk(["31/12/2023"], ativo_circulante=["Tributos a recuperar: 95"])
+        merged = merge_chunks([first, second])
+        self.assertEqual(merged.ativo_circulante, ["Tributos a recuperar: 120", "Tributos a recuperar: 95"])
+
+    def test_company_and_unit_come_from_most_chunks(self):
+        merged = merge_chunks([
+            chunk([], empresa="Vamos Locação"),
+            chunk([], empresa="", unidade="Em milhares de reais"),
+            chunk([], empresa="Vamos Locação"),
+        ])
+        self.assertEqual((merged.empresa, merged.unidade_monetaria), ("Vamos Locação", "Milhares de R$"))
+
+if __name__ == "__main__":
+    unittest.main()
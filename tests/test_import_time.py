@@ -0,0 +1,14 @@
+import unittest
+
+from benchmarks.import_time import BUDGETS, check
+
+class ImportTimeTest(unittest.TestCase):
+    def test_modules_import_within_budget_without_heavy_backends(self):
+        for module, budget in BUDGETS.items():
+            with self.subTest(module=module):
+                times, heavy = check(module)
+                self.assertLessEqual(times[module], budget, f"{module} imports in {times[module]:.1f} ms")
+                self.assertEqual(heavy, [], f"{module} imports heavy backends")
+
+if __name__ == "__main__":
+    unittest.main()
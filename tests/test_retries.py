@@ -0,0 +1,68 @@
+import asyncio
+import tempfile
+import unittest
+from importlib.util import find_spec
+
+import openai
+from openai.types.chat import ChatCompletion
+
+from agents.replay import Cassette, ReplayClient
+from batch_extract import run_with_retries
+
+REQUEST = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "Razão social?"}], "temperature": 0}
+
+COMPLETION = ChatCompletion.model_validate({
+    "id": "chatcmpl-replay",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [{
+        "index": 0,
+        "finish_reason": "stop",
+        "message": {"role": "assistant", "content": "Atradius Crédito y Caución"},
+    }],
+})
+
+class ReplayRetryTest(unittest.TestCase):
+    def setUp(self):
+        cassette_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cassette_dir.cleanup)
+        Cassette(cassette_dir.name).save(REQUEST, COMPLETION, latency=0.0)
+        self.client = ReplayClient(cassette_dir.name, latency=0.0, fail_first=1)
+
+    def test_injected_rate_limit_is_retried(self):
+        completion, retries = asyncio.run(run_with_retries(
+            lambda: self.client.chat.completions.create(**REQUEST), retries=3, backoff=0.0
+        ))
+        self.assertEqual(completion.choices[0].message.content, "Atradius Crédito y Caución")
+        self.assertEqual(retries, 1)
+        self.assertEqual((self.client.stats.calls, self.client.stats.failures), (2, 1))
+
+    @unittest.skipUnless(find_spec("pydantic_ai"), "pydantic_ai is not installed")
+    def test_injected_rate_limit_is_retried_through_pydantic_ai(self):
+        from pydantic_ai.exceptions import ModelHTTPError
+
+        async def run():
+            # What OpenAIModel does with the client's status errors
+            try:
+                return await self.client.chat.completions.create(**REQUEST)
+            except openai.APIStatusError as e:
+                raise ModelHTTPError(status_code=e.status_code, model_name=REQUEST["model"], body=e.body) from e
+
+        completion, retries = asyncio.run(run_with_retries(run, retries=3, backoff=0.0))
+        self.assertEqual(completion.id, COMPLETION.id)
+        self.assertEqual(retries, 1)
+
+    def test_other_errors_are_not_retried(self):
+        calls = []
+
+        async def run():
+            calls.append(1)
+            raise ValueError("bad output")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run_with_retries(run, retries=3, backoff=0.0))
+        self.assertEqual(len(calls), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import service
+
+PDF_PATH = Path(__file__).resolve().parent.parent / "data" / "esferatur.pdf"
+
+class _NoBoxes:
+    """Stands in for the empty box and score tensors of a page without tables."""
+
+    def cpu(self):
+        return []
+
+class FakeDetector:
+    """TableDetector stand-in: finds no table, so the job needs neither torch nor Tesseract."""
+
+    def __init__(self, batch_size=2):
+        self.batch_size = batch_size
+        self.pages = 0
+
+    def load(self):
+        pass
+
+    def detect(self, images, threshold=None, iou_threshold=None):
+        self.pages += len(images)
+        return [{"boxes": _NoBoxes(), "scores": _NoBoxes()} for _ in images]
+
+class TableJobTest(unittest.TestCase):
+    def test_table_job_runs_through_the_locked_detector(self):
+        detector = FakeDetector()
+        extraction_service = service.ExtractionService(workers=1, queue_size=2, tables=True, llm=False, use_cache=False)
+        with mock.patch("table_detection.get_detector", return_value=detector):
+            extraction_service.start()
+
+        job = extraction_service.submit(PDF_PATH.read_bytes(), {"prefilter": False, "llm": False, "tables": True})
+        extraction_service.queue.join()
+
+        self.assertEqual(job.status, "done", job.error)
+        self.assertEqual(extraction_service.detector.batch_size, detector.batch_size)
+        self.assertEqual(detector.pages, job.result["pages"])
+        self.assertEqual([page["tables"] for page in job.result["tables"]], [[]] * job.result["pages"])
+
+if __name__ == "__main__":
+    unittest.main()
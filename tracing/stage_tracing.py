@@ -0,0 +1,106 @@
+# --- Imports --- #
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from pathlib import Path
+from contextlib import contextmanager, nullcontext
+
+# --- Config --- #
+# Stages are appended as JSON lines to STAGE_TRACE_FILE when it is set. Library code and the
+# service record nothing to disk by default; the scripts (main.py, batch_extract.py) turn the
+# sink on with enable_file_sink. STAGE_TRACE_FILE=off keeps it off.
+DEFAULT_TRACE_FILE = ".cache/traces/stages.jsonl"
+TRACE_FILE = os.getenv("STAGE_TRACE_FILE")
+
+_write_lock = threading.Lock()
+_run = {"run_id": uuid.uuid4().hex, "document": None}
+
+def enable_file_sink(path=None):
+    """
+    Append the following stages to a JSONL file, in this process and the worker processes it starts
+
+    Args:
+        path: Trace file. Defaults to STAGE_TRACE_FILE, else DEFAULT_TRACE_FILE
+    Returns:
+        Path of the trace file, or "off" when STAGE_TRACE_FILE=off
+    """
+    global TRACE_FILE
+    TRACE_FILE = path or TRACE_FILE or DEFAULT_TRACE_FILE
+    # Spawned workers read the sink from the environment when they import this module
+    os.environ["STAGE_TRACE_FILE"] = TRACE_FILE
+    return TRACE_FILE
+
+def start_run(document=None, run_id=None):
+    """Starts a new run: the following stages are recorded under its id and document."""
+    _run["run_id"] = run_id or uuid.uuid4().hex
+    _run["document"] = str(document) if document is not None else None
+    return _run["run_id"]
+
+# --- Stages --- #
+class Stage:
+    """A running stage. Attributes set while it runs are recorded with its duration."""
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.start = time.time()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+def _write(record):
+    if not TRACE_FILE or TRACE_FILE == "off":
+        return
+    path = Path(TRACE_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _write_lock, path.open("a", encoding="utf-8") as f:
+        f.write(line)
+
+@contextmanager
+def stage(name, document=None, **attributes):
+    """
+    Times a pipeline stage as a logfire span and a JSONL record
+
+    Args:
+        name: Stage name, e.g. "parse", "ocr", "model_load", "inference", "llm_extraction"
+        document: Document the stage works on. Defaults to the current run's document
+        attributes: Extra attributes to record. More can be added with `.set()` on the
+            yielded Stage, e.g. token counts known only once the stage finished
+    Yields:
+        Stage object
+    """
+    current = Stage(name, attributes)
+    # Spans go to logfire only when the application imported it (main.py configures it); importing
+    # logfire here would add its startup cost to every worker
+    logfire = sys.modules.get("logfire")
+    span = logfire.span(name, **attributes) if logfire else nullcontext()
+    start = time.perf_counter()
+    error = None
+    with span as logfire_span:
+        try:
+            yield current
+        except GeneratorExit:
+            # A consumer stopped reading a traced generator early: not an error
+            raise
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current.duration = time.perf_counter() - start
+            if logfire_span is not None:
+                logfire_span.set_attributes(current.attributes)
+            _write({
+                "run_id": _run["run_id"],
+                "document": str(document) if document is not None else _run["document"],
+                "stage": name,
+                "start": current.start,
+                "duration": current.duration,
+                "pid": os.getpid(),
+                "error": error,
+                "attributes": current.attributes,
+            })
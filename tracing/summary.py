@@ -0,0 +1,80 @@
+"""
+Aggregate stage traces across runs
+
+Usage:
+    python -m tracing.summary [.cache/traces/stages.jsonl ...] [--document atradius]
+"""
+# --- Imports --- #
+import json
+import math
+import argparse
+from collections import defaultdict
+
+from tracing.stage_tracing import DEFAULT_TRACE_FILE, TRACE_FILE
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+def load_records(paths, document=None):
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if document is None or document in (record.get("document") or ""):
+                    records.append(record)
+    return records
+
+def summarize(records):
+    """
+    Per-stage statistics
+
+    Returns:
+        Dict mapping each stage to its count, errors, p50/p95/max/total duration and the
+        sum of its numeric attributes (pages, tokens, retries...)
+    """
+    by_stage = defaultdict(list)
+    for record in records:
+        by_stage[record["stage"]].append(record)
+
+    summary = {}
+    for name, stage_records in by_stage.items():
+        durations = [r["duration"] for r in stage_records]
+        totals = defaultdict(float)
+        for r in stage_records:
+            for key, value in r["attributes"].items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[key] += value
+        summary[name] = {
+            "count": len(stage_records),
+            "errors": sum(r.get("error") is not None for r in stage_records),
+            "p50": percentile(durations, 50),
+            "p95": percentile(durations, 95),
+            "max": max(durations),
+            "total": sum(durations),
+            "attributes": dict(totals),
+        }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", default=[TRACE_FILE or DEFAULT_TRACE_FILE], help="Trace files (JSONL)")
+    parser.add_argument("--document", help="Only stages of documents whose path contains this")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    summary = summarize(load_records(args.paths, args.document))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"{'stage':<20}{'count':>7}{'errors':>8}{'p50 s':>10}{'p95 s':>10}{'max s':>10}{'total s':>10}")
+    for name, s in sorted(summary.items(), key=lambda item: -item[1]["total"]):
+        print(f"{name:<20}{s['count']:>7}{s['errors']:>8}{s['p50']:>10.3f}{s['p95']:>10.3f}{s['max']:>10.3f}{s['total']:>10.2f}")
+        if s["attributes"]:
+            print(" " * 20 + ", ".join(f"{key}={value:g}" for key, value in s["attributes"].items()))
+
+if __name__ == "__main__":
+    main()